@@ -1,27 +1,103 @@
 import argparse
+import asyncio
+import typing as T
 
 import gh
 
 parser = argparse.ArgumentParser(description="Approve all open PRs.")
+parser.add_argument(
+    "--force",
+    action="store_true",
+    help="Approve PRs even if the secondary account already approved them.",
+)
+parser.add_argument(
+    "--batch-size",
+    type=int,
+    default=gh.batch.DEFAULT_MAX_SIZE,
+    help="The number of PRs to approve per request.",
+)
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=gh.aio.DEFAULT_CONCURRENCY,
+    help="The number of requests to have in flight at once.",
+)
 
 
 def main():
     args = parser.parse_args()
 
-    config = gh.config.get_config()
-    owner, name = config["github"]["repo"].split("/")
-    repo = gh.repo.get_repo(owner, name)
+    repo = gh.repo.get_configured_repo()
     print(repo)
+    run(repo, args)
 
-    # Get all open PRs
-    prs = gh.pr.list_repo_pull_requests(repo.id, states=["OPEN"])
-    print(f"Found {len(prs)} open PRs")
 
-    # Approve all PRs
-    with gh.github.github_account("secondary"):
-        for pr in prs:
-            review = gh.pr.add_pull_request_review(pr.id)
-            print(review)
+def run(repo: "gh.repo.Repo", args: argparse.Namespace) -> None:
+    """
+    Approve all open PRs with the secondary account.
+    """
+    gh.aio.set_concurrency(args.concurrency)
+    # The PRs are listed with the same secondary token (i.e., the same user)
+    # that approves them, so that the review state of each PR is the one of
+    # the approving user.
+    token = gh.github.get_token_pool("secondary").tokens[0]
+    with gh.github.github_account("secondary", token=token):
+        asyncio.run(approve_all(repo, batch_size=args.batch_size, force=args.force))
+
+
+async def approve_all(
+    repo: "gh.repo.Repo",
+    *,
+    batch_size: int = gh.batch.DEFAULT_MAX_SIZE,
+    force: bool = False,
+) -> int:
+    """
+    Approve all open PRs (with the current account).
+
+    Open PRs are streamed page by page and approved in concurrent batches.
+    Unless ``force`` is set, PRs that the current account already approved
+    (and that haven't been dismissed since) are skipped.
+    """
+    approved = gh.progress.Progress("Approved PRs")
+    skipped = 0
+
+    def needs_approval(pr: "gh.pr.PullRequest") -> bool:
+        nonlocal skipped
+        if force or not pr.is_approved_by_viewer():
+            return True
+        skipped += 1
+        return False
+
+    prs = gh.pr.iter_repo_pull_requests(
+        repo.id,
+        states=[gh.pr.STATE_OPEN],
+        projection=gh.query.STANDARD,
+        prefetch=True,
+    )
+    async for chunk, results, error in gh.aio.map_unordered(
+        _approve_prs, gh.utils.chunked(filter(needs_approval, prs), batch_size)
+    ):
+        if error:
+            print(f"Failed to approve {len(chunk)} PRs: {error}")
+            approved.update(0, failed=len(chunk))
+            continue
+        for pr, res in zip(chunk, results):
+            if res.ok():
+                approved.update()
+            else:
+                print(f"Failed to approve PR #{pr.number}: {res.error()}")
+                approved.update(0, failed=1)
+
+    approved.finish()
+    print(f"Skipped {skipped} already approved PRs")
+    return approved.done
+
+
+def _approve_prs(
+    prs: T.List["gh.pr.PullRequest"],
+) -> T.List["gh.batch.BatchResult[gh.pr.PullRequestReview]"]:
+    with gh.batch.Batch(max_size=len(prs)) as b:
+        return [b.add_pull_request_review(pr.id) for pr in prs]
 
 
 if __name__ == "__main__":
@@ -1,4 +1,6 @@
 import argparse
+import asyncio
+import typing as T
 
 import gh
 
@@ -9,29 +11,162 @@ parser.add_argument(
     action="store_true",
     help="Delete the branch after closing the PR.",
 )
+parser.add_argument(
+    "--prefix",
+    help="Only close PRs whose head branch name starts with this prefix.",
+)
+parser.add_argument(
+    "-l",
+    "--label",
+    action="append",
+    help="Only close PRs with this label. Can be specified multiple times.",
+)
+parser.add_argument(
+    "--batch-size",
+    type=int,
+    default=gh.batch.DEFAULT_MAX_SIZE,
+    help="The number of PRs to close (or branches to delete) per request.",
+)
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=gh.aio.DEFAULT_CONCURRENCY,
+    help="The number of requests to have in flight at once.",
+)
 
 
 def main():
     args = parser.parse_args()
 
-    config = gh.config.get_config()
-    owner, name = config["github"]["repo"].split("/")
-    repo = gh.repo.get_repo(owner, name)
+    repo = gh.repo.get_configured_repo()
     print(repo)
-    close_all(repo, args.delete_branch)
+    run(repo, args)
+
+
+def run(repo: "gh.repo.Repo", args: argparse.Namespace) -> None:
+    """
+    Close all open PRs that match the filters of ``args``.
+    """
+    gh.aio.set_concurrency(args.concurrency)
+    close_all(
+        repo,
+        args.delete_branch,
+        batch_size=args.batch_size,
+        prefix=args.prefix,
+        labels=args.label,
+    )
+
+
+def close_all(
+    repo: "gh.repo.Repo",
+    delete_branch: bool,
+    *,
+    batch_size: int = gh.batch.DEFAULT_MAX_SIZE,
+    prefix: T.Optional[str] = None,
+    labels: T.Optional[T.List[str]] = None,
+) -> None:
+    """
+    Close all open PRs (that match the filters).
+
+    Open PRs are streamed page by page and closed in concurrent batches. If
+    ``delete_branch`` is set, the head branches of the closed PRs are deleted
+    (also in concurrent batches) while the next PRs are being closed.
+    """
+    asyncio.run(
+        _close_all(
+            repo,
+            delete_branch,
+            batch_size=batch_size,
+            prefix=prefix,
+            labels=labels,
+        )
+    )
+
+
+async def _close_all(
+    repo: "gh.repo.Repo",
+    delete_branch: bool,
+    *,
+    batch_size: int,
+    prefix: T.Optional[str],
+    labels: T.Optional[T.List[str]],
+) -> None:
+    closed = gh.progress.Progress("Closed PRs")
+    deleted = gh.progress.Progress("Deleted branches")
+    deleting: T.List["asyncio.Future[None]"] = []
+    head_refs: T.List["gh.ref.Ref"] = []
+
+    def matches(pr: "gh.pr.PullRequest") -> bool:
+        if prefix and not (pr.head_ref and pr.head_ref.name.startswith(prefix)):
+            return False
+        return all(pr.has_label(label) for label in labels or [])
+
+    async def delete_refs(refs: T.List["gh.ref.Ref"]) -> None:
+        try:
+            results = await gh.aio.call(_delete_refs, refs)
+        except Exception as e:
+            print(f"Failed to delete {len(refs)} branches: {e}")
+            deleted.update(0, failed=len(refs))
+            return
+        for ref, res in zip(refs, results):
+            if res.ok():
+                deleted.update()
+            else:
+                print(f"Failed to delete {ref.name}: {res.error()}")
+                deleted.update(0, failed=1)
+
+    # Closing PRs can shift the pages of the listing, so keep listing the open
+    # PRs until a pass doesn't close anything.
+    while True:
+        before = closed.done
+        prs = gh.pr.iter_repo_pull_requests(
+            repo.id,
+            states=[gh.pr.STATE_OPEN],
+            projection=gh.query.STANDARD,
+            prefetch=True,
+        )
+        async for chunk, results, error in gh.aio.map_unordered(
+            _close_prs, gh.utils.chunked(filter(matches, prs), batch_size)
+        ):
+            if error:
+                print(f"Failed to close {len(chunk)} PRs: {error}")
+                closed.update(0, failed=len(chunk))
+                continue
+            for pr, res in zip(chunk, results):
+                if not res.ok():
+                    print(f"Failed to close PR #{pr.number}: {res.error()}")
+                    closed.update(0, failed=1)
+                    continue
+                closed.update()
+                if delete_branch and pr.head_ref:
+                    head_refs.append(pr.head_ref)
+            if len(head_refs) >= batch_size:
+                deleting.append(asyncio.ensure_future(delete_refs(head_refs)))
+                head_refs = []
+        if closed.done == before:
+            break
+
+    if head_refs:
+        deleting.append(asyncio.ensure_future(delete_refs(head_refs)))
+    await asyncio.gather(*deleting)
+
+    closed.finish()
+    if delete_branch:
+        deleted.finish()
+
 
+def _close_prs(
+    prs: T.List["gh.pr.PullRequest"],
+) -> T.List["gh.batch.BatchResult[gh.pr.PullRequest]"]:
+    with gh.batch.Batch(max_size=len(prs)) as b:
+        return [b.close_pull_request(pr.id, projection=gh.query.MINIMAL) for pr in prs]
 
-def close_all(repo: "gh.repo.Repo", delete_branch: bool):
-    # Get all open PRs
-    prs = gh.pr.list_repo_pull_requests(repo.id, states=["OPEN"])
 
-    # Close all PRs
-    for pr in prs:
-        pr = gh.pr.close_pull_request(pr.id)
-        print(pr)
-        if delete_branch:
-            gh.ref.mutation_delete_ref(pr.head_ref.id)
-            print(pr.head_ref)
+def _delete_refs(
+    refs: T.List["gh.ref.Ref"],
+) -> T.List["gh.batch.BatchResult[None]"]:
+    with gh.batch.Batch(max_size=len(refs)) as b:
+        return [b.mutation_delete_ref(ref.id) for ref in refs]
 
 
 if __name__ == "__main__":
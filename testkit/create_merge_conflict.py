@@ -1,11 +1,23 @@
 import argparse
+import asyncio
+import itertools
 import random
 import time
+import typing as T
 
 import gh
 
+# Every pair of PRs in a group conflicts on a file of its own.
+TOPOLOGY_ALL_PAIRS = "all-pairs"
+# Every PR in a group only conflicts with the previous and the next PR.
+TOPOLOGY_CHAIN = "chain"
+# Every PR in a group changes the same (hotspot) file, along with a file of its
+# own that doesn't conflict.
+TOPOLOGY_HOTSPOT = "hotspot"
+TOPOLOGIES = (TOPOLOGY_ALL_PAIRS, TOPOLOGY_CHAIN, TOPOLOGY_HOTSPOT)
+
 parser = argparse.ArgumentParser(
-    description=("Create two PRs with a merge conflict."),
+    description=("Create groups of PRs that have merge conflicts with each other."),
 )
 parser.add_argument(
     "-a",
@@ -19,40 +31,151 @@ parser.add_argument(
     action="append",
     help=("Add a label to the PR. Can be specified multiple times."),
 )
+parser.add_argument(
+    "-k",
+    "--size",
+    type=int,
+    default=2,
+    help="The number of PRs in every conflict group. Defaults to 2.",
+)
+parser.add_argument(
+    "-g",
+    "--groups",
+    type=int,
+    default=1,
+    help=(
+        "The number of conflict groups to create. PRs only conflict with PRs "
+        "of the same group. Defaults to 1."
+    ),
+)
+parser.add_argument(
+    "--topology",
+    choices=TOPOLOGIES,
+    default=TOPOLOGY_ALL_PAIRS,
+    help=(
+        "Which PRs of a group conflict with each other: every pair "
+        "(all-pairs), only neighbours (chain), or all of them on a single "
+        "file (hotspot). Defaults to all-pairs."
+    ),
+)
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=gh.aio.DEFAULT_CONCURRENCY,
+    help="The number of PRs to create in parallel.",
+)
 
 
 def main():
     args = parser.parse_args()
 
-    conf = gh.config.get_config()
-    repo_owner, repo_name = conf["github"]["repo"].split("/")
-    repo = gh.repo.get_repo(repo_owner, repo_name)
+    repo = gh.repo.get_configured_repo()
     print(repo)
+    run(repo, args)
+
+
+def run(repo: "gh.repo.Repo", args: argparse.Namespace) -> None:
+    """
+    Create ``args.groups`` groups of ``args.size`` conflicting PRs.
+    """
+    if args.size < 2:
+        parser.error("--size must be at least 2")
 
     id = str(random.randint(1, 100000))
-    file = f"mq-qa/merge-conflict.{id}.txt"
-    for n in range(2):
-        create_pr(repo, id, n, approve=args.approve, labels=args.label)
+    gh.aio.set_concurrency(args.concurrency)
+    started_at = time.monotonic()
+    prs = asyncio.run(create_conflict_groups(repo, id, args))
+    elapsed = time.monotonic() - started_at
+    total = args.groups * args.size
+    print(
+        f"\n\nCreated {len(prs)}/{total} PRs in {args.groups} groups in "
+        f"{elapsed:.1f}s ({len(prs) / elapsed:.2f} PRs/s)"
+    )
+
+
+async def create_conflict_groups(
+    repo: "gh.repo.Repo",
+    id: str,
+    args,
+) -> T.List["gh.pr.PullRequest"]:
+    """
+    Create ``args.groups`` groups of ``args.size`` conflicting PRs.
+
+    All the PRs (of all the groups) are created concurrently, since they are
+    all based on the head of the base branch.
+    """
+
+    def create(item: T.Tuple[int, int]) -> "gh.pr.PullRequest":
+        group, n = item
+        group_id = f"{id}-{group}"
+        return create_pr(
+            repo,
+            group_id,
+            n,
+            conflict_files(args.topology, group_id, n, args.size),
+            approve=args.approve,
+            labels=args.label,
+        )
+
+    prs = []
+    async for (group, n), pr, error in gh.aio.map_unordered(
+        create, itertools.product(range(args.groups), range(args.size))
+    ):
+        if error:
+            print(f"Failed to create PR {n} of group {group}: {error!r}")
+            continue
+        prs.append(pr)
+    return sorted(prs, key=lambda pr: pr.number)
+
+
+def conflict_files(topology: str, id: str, n: int, size: int) -> T.List[str]:
+    """
+    Get the files that the ``n``-th PR of a conflict group of ``size`` PRs
+    changes so that it conflicts with the other PRs of the group as described
+    by ``topology``.
+    """
+    prefix = f"mq-qa/{id}.merge-conflict"
+    if topology == TOPOLOGY_ALL_PAIRS:
+        return [
+            f"{prefix}.{min(n, other)}-{max(n, other)}.txt"
+            for other in range(size)
+            if other != n
+        ]
+    if topology == TOPOLOGY_CHAIN:
+        return [f"{prefix}.{link}.txt" for link in (n, n + 1)]
+    if topology == TOPOLOGY_HOTSPOT:
+        return [f"{prefix}.txt", f"{prefix}.{n}.txt"]
+    raise ValueError(f"Unknown conflict topology: {topology!r}")
 
 
 def create_pr(
-    repo: gh.repo.Repo, id: str, n: int, *, approve=False, labels=None
-) -> gh.pr:
+    repo: "gh.repo.Repo",
+    id: str,
+    n: int,
+    files: T.List[str],
+    *,
+    approve=False,
+    labels=None,
+) -> "gh.pr.PullRequest":
     branch_name = f"mq-qa-merge-conflict-{id}-{n}"
     pr_name = f"MQ QA: Merge Conflict: {id}-{n}"
 
+    base_sha = repo.head_sha
+
     # create a branch
-    branch = gh.ref.mutation_create_branch_ref(repo.id, branch_name, repo.head_sha)
+    branch = gh.ref.mutation_create_branch_ref(
+        repo.id, branch_name, base_sha, projection=gh.query.MINIMAL
+    )
     print(branch)
 
     # create a commit
+    contents = f"{pr_name}\n{time.time()}\n"
     branch_commit = gh.commit.mutation_create_commit_on_branch(
         branch.id,
-        repo.head_sha,
+        base_sha,
         pr_name,
-        additions=[
-            gh.commit.Addition(f"mq-qa/{id}.merge-conflict.txt", str(time.time())),
-        ],
+        additions=[gh.commit.Addition(file, contents) for file in files],
+        projection=gh.query.MINIMAL,
     )
     print(branch_commit)
 
@@ -62,6 +185,7 @@ def create_pr(
         pr_name,
         repo.base_branch_name,
         branch_name,
+        projection=gh.query.MINIMAL,
     )
     print(pr)
 
@@ -1,4 +1,5 @@
 import argparse
+import asyncio
 import random
 import time
 import typing as T
@@ -6,6 +7,10 @@ import pydantic
 
 import gh
 
+CONTENT_CUMULATIVE = "cumulative"
+CONTENT_ROLLING = "rolling"
+CONTENT_STRATEGIES = (CONTENT_CUMULATIVE, CONTENT_ROLLING)
+
 parser = argparse.ArgumentParser()
 parser.add_argument(
     "-a",
@@ -44,12 +49,61 @@ parser.add_argument(
         "(rather than appending to the same file)."
     ),
 )
+parser.add_argument(
+    "--content-strategy",
+    choices=CONTENT_STRATEGIES,
+    default=CONTENT_CUMULATIVE,
+    help=(
+        "How the file of every PR is built. `cumulative` contains a line for "
+        "every PR up to the PR itself, so its size grows with the depth of the "
+        "stack. `rolling` only keeps the lines of the last --window PRs, so "
+        "every PR still edits the lines of its parent but the size is bounded "
+        "(use this for deep stacks). Defaults to cumulative."
+    ),
+)
+parser.add_argument(
+    "--window",
+    type=int,
+    default=10,
+    help=(
+        "The number of lines to keep with --content-strategy=rolling (at "
+        "least 1). Defaults to 10."
+    ),
+)
+parser.add_argument(
+    "--bulk-commits",
+    action="store_true",
+    help=(
+        "Create the commits of the whole stack up front using the Git Data API "
+        "instead of one createCommitOnBranch mutation per PR (the commits are "
+        "not signed, and every commit takes 3 requests, so this is usually "
+        "slower)."
+    ),
+)
 parser.add_argument(
     "--merge",
     action="store_true",
     help=(
         "If set, merge the PR by commenting `/aviator stack merge` on the top "
-        "PR in the stack."
+        "PR in the stack (of every stack if --stacks > 1)."
+    ),
+)
+parser.add_argument(
+    "--stacks",
+    type=int,
+    default=1,
+    help=(
+        "The number of independent stacks to create. Every stack has --count "
+        "PRs. Defaults to 1."
+    ),
+)
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=gh.aio.DEFAULT_CONCURRENCY,
+    help=(
+        "The number of stacks to create in parallel (the PRs of a stack are "
+        "always created in order)."
     ),
 )
 
@@ -68,24 +122,90 @@ class AvPRMetadata(pydantic.BaseModel):
 def main(args: T.Optional[argparse.Namespace] = None) -> T.List["gh.pr.PullRequest"]:
     args = args or parser.parse_args()
 
-    conf = gh.config.get_config()
-    repo_owner, repo_name = conf["github"]["repo"].split("/")
-    repo = gh.repo.get_repo(repo_owner, repo_name)
+    repo = gh.repo.get_configured_repo()
     print(repo)
+    return run(repo, args)
+
+
+def run(repo: "gh.repo.Repo", args: argparse.Namespace) -> T.List["gh.pr.PullRequest"]:
+    """
+    Create ``args.stacks`` stacks of ``args.count`` PRs.
+    """
+    if args.window < 1:
+        parser.error("--window must be at least 1")
 
     tpl = f"mq-qa-stacked-{random.randint(0, 100000)}"
+    if args.stacks <= 1:
+        return create_stack(repo, tpl, args)
+
+    gh.aio.set_concurrency(args.concurrency)
+    started_at = time.monotonic()
+    stacks = asyncio.run(create_stacks(repo, tpl, args))
+    elapsed = time.monotonic() - started_at
+    n_prs = sum(len(prs) for prs in stacks)
+    print(
+        f"\n\nCreated {len(stacks)}/{args.stacks} stacks ({n_prs} PRs) in "
+        f"{elapsed:.1f}s ({n_prs / elapsed:.2f} PRs/s)"
+    )
+    return [pr for prs in stacks for pr in prs]
+
+
+async def create_stacks(
+    repo: "gh.repo.Repo",
+    tpl: str,
+    args,
+) -> T.List[T.List["gh.pr.PullRequest"]]:
+    """
+    Create ``args.stacks`` independent stacks concurrently.
+
+    Every stack is created on its own worker (in order, since every PR is
+    based on the previous one), so at most ``args.concurrency`` stacks are
+    being created at once.
+    """
+    stack_tpls = [f"{tpl}-s{i + 1}" for i in range(args.stacks)]
+    stacks = []
+    async for stack_tpl, prs, error in gh.aio.map_unordered(
+        lambda stack_tpl: create_stack(repo, stack_tpl, args), stack_tpls
+    ):
+        if error:
+            print(f"Failed to create stack {stack_tpl}: {error!r}")
+            continue
+        stacks.append(prs)
+    return sorted(stacks, key=lambda prs: prs[0].number)
+
+
+def create_stack(
+    repo: "gh.repo.Repo",
+    tpl: str,
+    args,
+) -> T.List["gh.pr.PullRequest"]:
+    """
+    Create a stack of ``args.count`` PRs whose branches are named after
+    ``tpl``.
+    """
     base_branch = None
     base_sha = None
     root_branch, root_sha = None, None
 
     prs: T.List["gh.pr.PullRequest"] = []
 
+    commit_shas: T.List[T.Optional[str]] = [None] * args.count
+    if args.bulk_commits:
+        commit_shas = list(build_stack_commits(repo, tpl, args))
+
     for n in range(1, args.count + 1):
-        print("\n\nCreating PR #{}/{}".format(n, args.count))
+        print("\n\nCreating PR #{}/{} of {}".format(n, args.count, tpl))
         base_branch_name = base_branch.name if base_branch else repo.base_branch_name
         parent_pr_number = prs[-1].number if prs else None
         pr, base_branch, base_sha = create_new_pr(
-            repo, tpl, n, base_branch_name, base_sha, parent_pr_number, args
+            repo,
+            tpl,
+            n,
+            base_branch_name,
+            base_sha,
+            parent_pr_number,
+            args,
+            commit_sha=commit_shas[n - 1],
         )
         prs.append(pr)
         if not root_branch:
@@ -96,7 +216,7 @@ def main(args: T.Optional[argparse.Namespace] = None) -> T.List["gh.pr.PullReque
         update_original(root_branch, root_sha, tpl)
 
     if args.merge:
-        print("\n\nPosting merge comment on top of stack")
+        print(f"\n\nPosting merge comment on top of stack {tpl}")
         # Sleep for a few seconds to make sure that the queue has had the chance
         # to register the PR as a stacked PR
         time.sleep(3)
@@ -114,27 +234,37 @@ def create_new_pr(
     base_sha: T.Optional[str],
     base_pr_number: T.Optional[int],
     args,
+    *,
+    commit_sha: T.Optional[str] = None,
 ) -> T.Tuple["gh.pr.PullRequest", "gh.ref.Ref", str]:
+    """
+    Create the branch, commit and PR for the ``n``-th PR of the stack.
+
+    If ``commit_sha`` is given, the commit was already created (see
+    ``build_stack_commits``) and the branch is created pointing to it.
+    """
     branch_name = f"{tpl}-{n}"
     pr_name = f"{tpl} [{n}]"
 
     branch_sha = base_sha if base_sha else repo.head_sha
 
     # create a branch
-    branch = gh.ref.mutation_create_branch_ref(repo.id, branch_name, branch_sha)
+    branch = gh.ref.mutation_create_branch_ref(
+        repo.id, branch_name, commit_sha or branch_sha, projection=gh.query.MINIMAL
+    )
     print(branch)
 
     # create a commit
-    file_name = f"mq-qa/{tpl}-{n}.txt" if args.unique_files else f"mq-qa/{tpl}.txt"
-    branch_commit = gh.commit.mutation_create_commit_on_branch(
-        branch.id,
-        branch_sha,
-        pr_name,
-        additions=[
-            gh.commit.Addition(file_name, make_contents(tpl, n)),
-        ],
-    )
-    print(branch_commit)
+    if not commit_sha:
+        branch_commit = gh.commit.mutation_create_commit_on_branch(
+            branch.id,
+            branch_sha,
+            pr_name,
+            additions=[make_addition(tpl, n, args)],
+            projection=gh.query.MINIMAL,
+        )
+        print(branch_commit)
+        commit_sha = branch_commit.sha
 
     # open a pr
     metadata = AvPRMetadata(
@@ -156,6 +286,7 @@ def create_new_pr(
             "```\n"
             "-->"
         ),
+        projection=gh.query.MINIMAL,
     )
     print(pr)
 
@@ -170,11 +301,38 @@ def create_new_pr(
         label_ids = [repo.resolve_label_id(label) for label in args.label]
         gh.pr.add_labels(pr.id, label_ids)
 
-    return pr, branch, branch_commit.sha
+    return pr, branch, commit_sha
+
+
+def build_stack_commits(repo: "gh.repo.Repo", tpl: str, args) -> T.List[str]:
+    """
+    Create the commits of every PR of the stack (each on top of the previous
+    one) and return their SHAs.
+    """
+    commits = [
+        gh.commit.CommitSpec(f"{tpl} [{n}]", [make_addition(tpl, n, args)])
+        for n in range(1, args.count + 1)
+    ]
+    shas = gh.commit.build_commit_chain(repo.full_name, repo.head_sha, commits)
+    print(f"Created {len(shas)} commits")
+    return shas
+
+
+def make_addition(tpl: str, n: int, args) -> "gh.commit.Addition":
+    file_name = f"mq-qa/{tpl}-{n}.txt" if args.unique_files else f"mq-qa/{tpl}.txt"
+    window = args.window if args.content_strategy == CONTENT_ROLLING else None
+    return gh.commit.Addition(file_name, make_contents(tpl, n, window=window))
 
 
-def make_contents(tpl: str, n: int) -> str:
-    return "".join([f"{tpl} #{idx}\n" for idx in range(1, n + 1)])
+def make_contents(tpl: str, n: int, *, window: T.Optional[int] = None) -> str:
+    """
+    Make the contents of the file of the ``n``-th PR: a line for every PR up to
+    ``n`` (or only for the last ``window`` PRs).
+    """
+    if window is not None and window < 1:
+        raise ValueError(f"window must be at least 1 (got {window})")
+    start = max(1, n - window + 1) if window is not None else 1
+    return "".join([f"{tpl} #{idx}\n" for idx in range(start, n + 1)])
 
 
 def update_original(base_ref: "gh.ref.Ref", base_sha: str, tpl: str):
@@ -188,6 +346,7 @@ def update_original(base_ref: "gh.ref.Ref", base_sha: str, tpl: str):
         additions=[
             gh.commit.Addition(f"mq-qa/{tpl}.txt", contents),
         ],
+        projection=gh.query.MINIMAL,
     )
     print("\nUpdating original branch with new commit")
     print(branch_commit)
@@ -1,4 +1,6 @@
 import argparse
+import asyncio
+import typing as T
 
 import gh
 
@@ -9,18 +11,88 @@ parser = argparse.ArgumentParser(
         "that is deleted."
     ),
 )
+parser.add_argument(
+    "--prefix",
+    default="mq-qa-",
+    help="Delete the branches that match this name query. Defaults to mq-qa-.",
+)
+parser.add_argument(
+    "--batch-size",
+    type=int,
+    default=gh.batch.DEFAULT_MAX_SIZE,
+    help="The number of branches to delete per request.",
+)
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=gh.aio.DEFAULT_CONCURRENCY,
+    help="The number of delete requests to have in flight at once.",
+)
 
 
 def main():
-    config = gh.config.get_config()
-    owner, name = config["github"]["repo"].split("/")
-    repo = gh.repo.get_repo(owner, name)
+    args = parser.parse_args()
+
+    repo = gh.repo.get_configured_repo()
     print(repo)
+    run(repo, args)
+
+
+def run(repo: "gh.repo.Repo", args: argparse.Namespace) -> None:
+    """
+    Delete all the branches that match ``args.prefix``.
+    """
+    gh.aio.set_concurrency(args.concurrency)
+    asyncio.run(delete_branches(repo, args.prefix, batch_size=args.batch_size))
+
+
+async def delete_branches(
+    repo: "gh.repo.Repo",
+    prefix: str,
+    *,
+    batch_size: int = gh.batch.DEFAULT_MAX_SIZE,
+) -> int:
+    """
+    Delete all the branches that match ``prefix``.
+
+    Branches are streamed page by page and deleted in concurrent batches while
+    the next pages are fetched. Since deleting branches shifts the pages of
+    the listing, the listing is repeated until no (deletable) branches remain.
+    """
+    progress = gh.progress.Progress("Deleted branches")
+    while True:
+        before = progress.done
+        refs = gh.ref.iter_refs(
+            repo.id,
+            prefix,
+            ref_prefix="refs/heads/",
+            projection=gh.query.MINIMAL,
+            prefetch=True,
+        )
+        async for chunk, results, error in gh.aio.map_unordered(
+            _delete_refs, gh.utils.chunked(refs, batch_size)
+        ):
+            if error:
+                print(f"Failed to delete {len(chunk)} branches: {error}")
+                progress.update(0, failed=len(chunk))
+                continue
+            for ref, res in zip(chunk, results):
+                if res.ok():
+                    progress.update()
+                else:
+                    print(f"Failed to delete {ref.name}: {res.error()}")
+                    progress.update(0, failed=1)
+        if progress.done == before:
+            break
+    progress.finish()
+    return progress.done
+
 
-    branch_refs = gh.ref.query_list_refs(repo.id, "mq-qa-", ref_prefix="refs/heads/")
-    for branch_ref in branch_refs:
-        print(branch_ref)
-        gh.ref.mutation_delete_ref(branch_ref.id)
+def _delete_refs(
+    refs: T.List["gh.ref.Ref"],
+) -> T.List["gh.batch.BatchResult[None]"]:
+    with gh.batch.Batch(max_size=len(refs)) as b:
+        return [b.mutation_delete_ref(ref.id) for ref in refs]
 
 
 if __name__ == "__main__":
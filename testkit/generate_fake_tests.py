@@ -1,38 +1,167 @@
+import argparse
+import multiprocessing
+import os
 import random
 import string
+import time
 import typing as T
 
+import gh
 
-def write_file() -> None:
-    path = "test_" + random_str() + ".py"
-    content = generate_class()
+# Maps every byte to a lowercase letter (slightly biased towards the first
+# letters, which doesn't matter for names of fake tests).
+_LETTERS = bytes(ord("a") + i % len(string.ascii_lowercase) for i in range(256))
+
+METHOD_TEMPLATE = (
+    "    def test_%s(self):\n"
+    "        self.assertTrue(True)\n"
+    "        self.assertFalse(False)\n"
+)
+
+parser = argparse.ArgumentParser(description="Generate fake unittest files.")
+parser.add_argument(
+    "-f",
+    "--files",
+    type=int,
+    default=10,
+    help="The number of test files to generate. Defaults to 10.",
+)
+parser.add_argument(
+    "-m",
+    "--methods",
+    type=int,
+    default=100,
+    help="The number of test methods in every file. Defaults to 100.",
+)
+parser.add_argument(
+    "--seed",
+    type=int,
+    help=(
+        "The seed to generate the tests from. The same seed (and counts) always "
+        "generates the same files. Defaults to a random seed."
+    ),
+)
+parser.add_argument(
+    "-o",
+    "--output-dir",
+    default=".",
+    help="The directory to write the files to. Defaults to the current directory.",
+)
+parser.add_argument(
+    "-p",
+    "--processes",
+    type=int,
+    default=1,
+    help="The number of processes to generate the files with. Defaults to 1.",
+)
+
+
+def main():
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2**32)
+    print(f"Generating {args.files} files with seed {seed}")
+    started_at = time.monotonic()
+    os.makedirs(args.output_dir, exist_ok=True)
+    paths = write_files(
+        args.files,
+        args.methods,
+        seed=seed,
+        output_dir=args.output_dir,
+        processes=args.processes,
+    )
+    elapsed = time.monotonic() - started_at
+    n_tests = len(paths) * args.methods
+    print(
+        f"Generated {len(paths)} files ({n_tests} tests) in {elapsed:.1f}s "
+        f"({n_tests / elapsed:.0f} tests/s)"
+    )
+
+
+def write_files(
+    files: int,
+    methods: int,
+    *,
+    seed: int,
+    output_dir: str = ".",
+    processes: int = 1,
+) -> T.List[str]:
+    """
+    Write ``files`` test files with ``methods`` test methods each and return
+    their paths.
+    """
+    tasks = [(seed, n, methods, output_dir) for n in range(files)]
+    return _map(_write_file, tasks, processes)
+
+
+def generate_additions(
+    files: int,
+    methods: int,
+    *,
+    seed: int,
+    directory: str = "mq-qa/tests",
+    processes: int = 1,
+) -> T.List["gh.commit.Addition"]:
+    """
+    Generate test files as additions for a commit (e.g., for
+    ``gh.commit.mutation_create_commit_on_branch``) instead of writing them.
+    """
+    tasks = [(seed, n, methods, directory) for n in range(files)]
+    return [
+        gh.commit.Addition(path, content)
+        for path, content in _map(_generate_file, tasks, processes)
+    ]
+
+
+def write_file(rng: random.Random, methods: int = 100, output_dir: str = ".") -> str:
+    path = os.path.join(output_dir, "test_" + random_str(rng) + ".py")
     with open(path, "w") as file:
-        file.write(content)
-    print("File %s created" % path)
+        # Stream the class to the file rather than building it in memory.
+        file.writelines(iter_class(rng, methods))
+    return path
+
+
+def generate_class(rng: random.Random, methods: int = 100) -> str:
+    return "".join(iter_class(rng, methods))
+
+
+def iter_class(rng: random.Random, methods: int) -> T.Iterator[str]:
+    yield "import unittest\n\n\nclass Test" + random_str(rng) + "(unittest.TestCase):\n"
+    for n in range(methods):
+        if n:
+            yield "\n"
+        yield METHOD_TEMPLATE % random_str(rng)
+
+
+def random_str(rng: random.Random, count=10) -> str:
+    return rng.randbytes(count).translate(_LETTERS).decode()
+
+
+def _file_rng(seed: int, n: int) -> random.Random:
+    # Every file has its own generator so that the files don't depend on the
+    # order (or the process) in which they are generated.
+    return random.Random(f"{seed}-{n}")
 
 
-def generate_class() -> str:
-    chunks: T.List[str] = []
-    chunks.append("import unittest\n\n")
-    chunks.append("class Test" + random_str() + "(unittest.TestCase):")
-    chunks.append(generate_methods(100))
-    return "\n".join(chunks)
+def _write_file(task: T.Tuple[int, int, int, str]) -> str:
+    seed, n, methods, output_dir = task
+    return write_file(_file_rng(seed, n), methods, output_dir)
 
 
-def generate_methods(count: int) -> str:
-    chunks: T.List[str] = []
-    for _ in range(count):
-        chunks.append("    def test_" + random_str() + "(self):")
-        chunks.append("        self.assertTrue(True)")
-        chunks.append("        self.assertFalse(False)\n")
-    return "\n".join(chunks)
+def _generate_file(task: T.Tuple[int, int, int, str]) -> T.Tuple[str, str]:
+    seed, n, methods, directory = task
+    rng = _file_rng(seed, n)
+    path = f"{directory}/test_{random_str(rng)}.py"
+    return path, generate_class(rng, methods)
 
 
-def random_str(count=10):
-    letters = string.ascii_lowercase
-    return "".join(random.choice(letters) for i in range(count))
+def _map(fn: T.Callable, tasks: T.List, processes: int) -> T.List:
+    if processes <= 1 or len(tasks) <= 1:
+        return [fn(task) for task in tasks]
+    with multiprocessing.Pool(processes) as pool:
+        chunksize = max(1, len(tasks) // (processes * 4))
+        return pool.map(fn, tasks, chunksize=chunksize)
 
 
 if __name__ == "__main__":
-    for _ in range(10):
-        write_file()
+    main()
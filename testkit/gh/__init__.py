@@ -1,10 +1,19 @@
 from . import (
+    aio,
+    batch,
+    cache,
     commit,
     config,
     github,
+    identity,
     issue,
     pr,
+    progress,
+    query,
+    ratelimit,
     ref,
     repo,
+    retry,
+    tokens,
     utils,
 )
@@ -0,0 +1,160 @@
+"""
+Asyncio versions of the gh API functions.
+
+Every function is run on a worker thread so that many requests can be in
+flight at once. The number of concurrent requests is bounded by a semaphore
+(see ``set_concurrency``). The current context (including the account set by
+``gh.github.github_account``) is copied into the worker thread, so this works
+as expected:
+
+    with gh.github.github_account("secondary"):
+        await gh.aio.add_pull_request_review(pr.id)
+
+Each asyncio task runs in its own copy of the context, so setting the account
+in one task does not affect any other task.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import typing as T
+import weakref
+
+from . import commit, issue, pr, ref, repo
+
+DEFAULT_CONCURRENCY = 10
+
+A = T.TypeVar("A")
+R = T.TypeVar("R")
+
+_EXHAUSTED = object()
+
+_concurrency = DEFAULT_CONCURRENCY
+_executor: T.Optional[concurrent.futures.ThreadPoolExecutor] = None
+_semaphores: T.MutableMapping[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def set_concurrency(limit: int) -> None:
+    """
+    Set the maximum number of requests that can be in flight at once.
+
+    The ``github.http.poolSize`` config setting should be at least as large as
+    this, otherwise connections will be opened and discarded instead of being
+    kept alive.
+    """
+    global _concurrency, _executor
+    if limit < 1:
+        raise ValueError(f"Concurrency limit must be at least 1 (got {limit})")
+    _concurrency = limit
+    _semaphores.clear()
+    if _executor:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def get_concurrency() -> int:
+    return _concurrency
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=_concurrency,
+            thread_name_prefix="gh-aio",
+        )
+    return _executor
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(_concurrency)
+    return semaphore
+
+
+async def call(fn: T.Callable[..., R], *args, **kwargs) -> R:
+    """
+    Call a (blocking) function on a worker thread, waiting for a free slot if
+    the concurrency limit has been reached.
+    """
+    async with _get_semaphore():
+        ctx = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            _get_executor(),
+            functools.partial(ctx.run, fn, *args, **kwargs),
+        )
+
+
+async def map_unordered(
+    fn: T.Callable[[A], R],
+    items: T.Iterable[A],
+    *,
+    limit: T.Optional[int] = None,
+) -> T.AsyncIterator[T.Tuple[A, T.Optional[R], T.Optional[BaseException]]]:
+    """
+    Call a (blocking) function for every item, yielding ``(item, result,
+    error)`` in the order in which the calls complete.
+
+    At most ``limit`` calls (by default, the concurrency limit) are in flight
+    at once. Items are only taken from ``items`` when there is room for
+    another call, and they are taken on a worker thread, so ``items`` may be a
+    generator that makes requests (e.g., one that paginates).
+    """
+    limit = limit or _concurrency
+    iterator = iter(items)
+    pending: T.Dict["asyncio.Future[R]", A] = {}
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < limit:
+                item = await asyncio.to_thread(next, iterator, _EXHAUSTED)
+                if item is _EXHAUSTED:
+                    exhausted = True
+                    break
+                pending[asyncio.ensure_future(call(fn, item))] = item
+            if not pending:
+                return
+            done, _ = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                item = pending.pop(future)
+                error = future.exception()
+                yield item, None if error else future.result(), error
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _wrap(fn: T.Callable[..., R]) -> T.Callable[..., T.Awaitable[R]]:
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs) -> R:
+        return await call(fn, *args, **kwargs)
+
+    return wrapper
+
+
+get_repo = _wrap(repo.get_repo)
+
+mutation_create_commit_on_branch = _wrap(commit.mutation_create_commit_on_branch)
+get_branch_commits = _wrap(commit.get_branch_commits)
+build_commit_chain = _wrap(commit.build_commit_chain)
+
+mutation_create_branch_ref = _wrap(ref.mutation_create_branch_ref)
+mutation_delete_ref = _wrap(ref.mutation_delete_ref)
+query_list_refs = _wrap(ref.query_list_refs)
+
+create_pull_request = _wrap(pr.create_pull_request)
+list_repo_pull_requests = _wrap(pr.list_repo_pull_requests)
+get_repo_pull_request = _wrap(pr.get_repo_pull_request)
+get_repo_pull_requests = _wrap(pr.get_repo_pull_requests)
+close_pull_request = _wrap(pr.close_pull_request)
+add_labels = _wrap(pr.add_labels)
+remove_labels = _wrap(pr.remove_labels)
+add_pull_request_review = _wrap(pr.add_pull_request_review)
+
+add_comment = _wrap(issue.add_comment)
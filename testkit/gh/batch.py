@@ -0,0 +1,250 @@
+"""
+Batch many GraphQL mutations into a single request.
+
+GraphQL allows multiple (aliased) fields in a single document, so instead of
+sending one HTTP request per mutation, operations are accumulated and sent
+together:
+
+    with gh.batch.Batch() as b:
+        results = [b.close_pull_request(pr.id) for pr in prs]
+    for res in results:
+        print(res.result())
+
+Operations are flushed when the batch reaches ``max_size`` operations, when
+``flush`` is called explicitly, and when the ``with`` block exits. Every
+operation returns a ``BatchResult`` whose ``result()`` either returns the
+decoded value or raises the error GitHub reported for that operation.
+"""
+import dataclasses
+import typing as T
+
+from . import query
+from .github import GraphQLErrorsException, graphql
+from .pr import PullRequest, PullRequestReview
+from .pr import _decode as _decode_pull_request
+
+DEFAULT_MAX_SIZE = 50
+
+R = T.TypeVar("R")
+
+
+class BatchResult(T.Generic[R]):
+    def __init__(self):
+        # The alias is assigned when the operation is flushed.
+        self.alias: T.Optional[str] = None
+        self._done = False
+        self._value: T.Optional[R] = None
+        self._error: T.Optional[Exception] = None
+
+    def __repr__(self):
+        if not self._done:
+            state = "pending"
+        elif self._error:
+            state = f"error={self._error!r}"
+        else:
+            state = f"value={self._value!r}"
+        return f"{self.__class__.__name__}({self.alias}, {state})"
+
+    def done(self) -> bool:
+        return self._done
+
+    def ok(self) -> bool:
+        return self._done and self._error is None
+
+    def error(self) -> T.Optional[Exception]:
+        return self._error
+
+    def result(self) -> R:
+        if not self._done:
+            raise RuntimeError(f"Batch operation {self.alias} has not been flushed")
+        if self._error:
+            raise self._error
+        return self._value
+
+    def _set_result(self, value: R) -> None:
+        self._value = value
+        self._done = True
+
+    def _set_error(self, error: Exception) -> None:
+        self._error = error
+        self._done = True
+
+
+@dataclasses.dataclass
+class _Operation:
+    field: str
+    input_type: str
+    input: dict
+    selection: str
+    fragments: T.List[str]
+    decode: T.Callable[[dict], T.Any]
+    result: BatchResult
+
+
+class Batch:
+    def __init__(self, *, max_size: int = DEFAULT_MAX_SIZE):
+        if max_size < 1:
+            raise ValueError(f"Batch size must be at least 1 (got {max_size})")
+        self.max_size = max_size
+        self._pending: T.List[_Operation] = []
+
+    def __enter__(self) -> "Batch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(
+        self,
+        field: str,
+        input_type: str,
+        input: dict,
+        *,
+        selection: str = "clientMutationId",
+        fragments: T.Sequence[str] = (),
+        decode: T.Callable[[dict], T.Any] = lambda data: None,
+    ) -> BatchResult:
+        """
+        Add a mutation to the batch.
+
+        :param field: The name of the mutation field (e.g. ``closePullRequest``).
+        :param input_type: The GraphQL type of the mutation input.
+        :param input: The mutation input.
+        :param selection: The selection set of the mutation payload.
+        :param fragments: Definitions of unregistered fragments used by
+            ``selection`` (see ``gh.query``).
+        :param decode: Function to transform the payload into the result.
+        """
+        op = _Operation(
+            field=field,
+            input_type=input_type,
+            input=input,
+            selection=selection,
+            fragments=list(fragments),
+            decode=decode,
+            result=BatchResult(),
+        )
+        self._pending.append(op)
+        if len(self._pending) >= self.max_size:
+            self.flush()
+        return op.result
+
+    def flush(self) -> None:
+        """
+        Send all pending operations to GitHub.
+        """
+        while self._pending:
+            ops = self._pending[: self.max_size]
+            self._pending = self._pending[self.max_size :]
+            _execute(ops)
+
+    def close_pull_request(
+        self, pr_id: str, *, projection: str = query.FULL
+    ) -> BatchResult[PullRequest]:
+        fragment = query.projected("PullRequest", projection)
+        return self.add(
+            "closePullRequest",
+            "ClosePullRequestInput",
+            {"pullRequestId": pr_id},
+            selection=f"pullRequest {{ ...{fragment} }}",
+            # Fetches the rest of the labels if there are more than a page.
+            decode=lambda data: _decode_pull_request(data["pullRequest"]),
+        )
+
+    def add_labels(self, id: str, label_ids: T.List[str]) -> BatchResult[None]:
+        return self.add(
+            "addLabelsToLabelable",
+            "AddLabelsToLabelableInput",
+            {"labelableId": id, "labelIds": label_ids},
+        )
+
+    def remove_labels(self, id: str, label_ids: T.List[str]) -> BatchResult[None]:
+        return self.add(
+            "removeLabelsFromLabelable",
+            "RemoveLabelsFromLabelableInput",
+            {"labelableId": id, "labelIds": label_ids},
+        )
+
+    def mutation_delete_ref(self, ref_id: str) -> BatchResult[None]:
+        return self.add(
+            "deleteRef",
+            "DeleteRefInput",
+            {"refId": ref_id},
+        )
+
+    def add_pull_request_review(
+        self,
+        pull_request_id: str,
+        event: str = "APPROVE",
+    ) -> BatchResult[PullRequestReview]:
+        return self.add(
+            "addPullRequestReview",
+            "AddPullRequestReviewInput",
+            {"pullRequestId": pull_request_id, "event": event},
+            selection="pullRequestReview { ...PullRequestReview }",
+            decode=lambda data: PullRequestReview.from_graphql(
+                data["pullRequestReview"]
+            ),
+        )
+
+
+def _build_document(ops: T.List[_Operation]) -> str:
+    # Aliases only depend on the position of the operation in the document so
+    # that identical batches compile to the same (cached) document.
+    for i, op in enumerate(ops):
+        op.result.alias = f"op{i}"
+    params = ", ".join(f"$input_{op.result.alias}: {op.input_type}!" for op in ops)
+    fields = "\n".join(
+        f"    {op.result.alias}: {op.field}(input: $input_{op.result.alias}) "
+        f"{{ {op.selection} }}"
+        for op in ops
+    )
+    fragments = []
+    for op in ops:
+        for fragment in op.fragments:
+            if fragment not in fragments:
+                fragments.append(fragment)
+    return f"mutation Batch({params}) {{\n{fields}\n}}\n" + "".join(fragments)
+
+
+def _execute(ops: T.List[_Operation]) -> None:
+    query = _build_document(ops)
+    try:
+        payload = graphql(
+            query,
+            variables={f"input_{op.result.alias}": op.input for op in ops},
+            raise_graphql_errors=False,
+        )
+    except Exception as e:
+        for op in ops:
+            op.result._set_error(e)
+        raise
+
+    # Errors for a particular operation have a path that starts with its alias.
+    # Errors without a path (e.g., a syntax error) apply to the whole document.
+    errors_by_alias: T.Dict[T.Optional[str], T.List[dict]] = {}
+    for error in payload.get("errors") or []:
+        path = error.get("path") or [None]
+        errors_by_alias.setdefault(path[0], []).append(error)
+
+    data = payload.get("data") or {}
+    for op in ops:
+        alias = op.result.alias
+        errors = errors_by_alias.get(alias, []) + errors_by_alias.get(None, [])
+        value = data.get(alias)
+        if errors or value is None:
+            op.result._set_error(
+                GraphQLErrorsException(
+                    errors or [{"message": f"No data returned for {op.field}"}],
+                    query,
+                )
+            )
+            continue
+        try:
+            op.result._set_result(op.decode(value))
+        except Exception as e:
+            op.result._set_error(e)
@@ -0,0 +1,124 @@
+"""
+A small on-disk cache for data that rarely changes (e.g., the id and labels of
+the repository), so that it doesn't have to be fetched on every run.
+
+Entries are stored as JSON in a single file and expire after a TTL. Keys
+should include everything the data depends on (e.g., the repository and a
+fingerprint of the token that fetched it, see ``key``). The cache is
+configured with the ``github.cache`` config setting.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import typing as T
+
+from .config import get_config
+
+DEFAULT_PATH = ".testkit-cache.json"
+DEFAULT_TTL = 3600.0
+
+
+class Cache:
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        *,
+        ttl: float = DEFAULT_TTL,
+        enabled: bool = True,
+    ):
+        """
+        :param ttl: The number of seconds after which entries expire.
+        :param enabled: If false, nothing is read from or written to disk.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries: T.Optional[T.Dict[str, T.Dict[str, T.Any]]] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Cache":
+        return cls(
+            config.get("path", DEFAULT_PATH),
+            ttl=config.get("ttl", DEFAULT_TTL),
+            enabled=config.get("enabled", True),
+        )
+
+    def get(self, key: str) -> T.Optional[T.Any]:
+        """
+        Get the value of an entry, or ``None`` if it's missing or expired.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is None or time.time() - entry["storedAt"] > self.ttl:
+            return None
+        return entry["value"]
+
+    def set(self, key: str, value: T.Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._load()[key] = {"storedAt": time.time(), "value": value}
+            self._save()
+
+    def invalidate(self, key: T.Optional[str] = None) -> None:
+        """
+        Remove an entry (or all the entries if ``key`` is ``None``).
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            entries = self._load()
+            if key is None:
+                entries.clear()
+            else:
+                entries.pop(key, None)
+            self._save()
+
+    def _load(self) -> T.Dict[str, T.Dict[str, T.Any]]:
+        if self._entries is None:
+            try:
+                with open(self.path) as fp:
+                    self._entries = json.load(fp)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self) -> None:
+        # Write to a temporary file first so that other processes never read
+        # a partially written cache.
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".testkit-cache.")
+        try:
+            with os.fdopen(fd, "w") as fp:
+                json.dump(self._entries, fp)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+_cache: T.Optional[Cache] = None
+
+
+def get_cache() -> Cache:
+    global _cache
+    if _cache is None:
+        _cache = Cache.from_config(get_config()["github"].get("cache", {}))
+    return _cache
+
+
+def key(*parts: str) -> str:
+    return ":".join(parts)
+
+
+def fingerprint(secret: str) -> str:
+    """
+    Get a short hash of a secret (e.g., a token) to use in a key.
+    """
+    return hashlib.sha256(secret.encode()).hexdigest()[:16]
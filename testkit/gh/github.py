@@ -1,25 +1,62 @@
+import atexit
 import contextlib
 import contextvars
 import dataclasses
 import json
 import textwrap
+import threading
+import time
 import typing as T
 
 import requests
+import requests.adapters
 
+from . import cache, ratelimit, retry, tokens
 from .config import get_config
+from .query import FULL, Document, compile as compile_query
 
 
+GRAPHQL_URL = "https://api.github.com/graphql"
+REST_URL = "https://api.github.com"
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 60.0
+# The number of times to wait for (and then retry) a rate limited request
+# before giving up.
+DEFAULT_MAX_RATE_LIMIT_WAITS = 10
+
+R = T.TypeVar("R")
+
 account_ctx = contextvars.ContextVar("github_account", default="primary")
+token_ctx: contextvars.ContextVar[T.Optional[str]] = contextvars.ContextVar(
+    "github_token", default=None
+)
+
+_sessions: T.Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+_rate_limiters: T.Dict[str, ratelimit.RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+_token_pools: T.Dict[str, tokens.TokenPool] = {}
+_token_pools_lock = threading.Lock()
 
 
 @contextlib.contextmanager
-def github_account(account: str):
-    token = account_ctx.set(account)
+def github_account(account: str, *, token: T.Optional[str] = None):
+    """
+    Make requests as the given account.
+
+    By default, every request uses a token chosen from the account's token
+    pool. If ``token`` is given, all requests use that token instead (e.g.,
+    if several requests must be made by the same user).
+    """
+    account_reset = account_ctx.set(account)
+    token_reset = token_ctx.set(token)
     try:
         yield
     finally:
-        account_ctx.reset(token)
+        token_ctx.reset(token_reset)
+        account_ctx.reset(account_reset)
 
 
 @dataclasses.dataclass
@@ -33,41 +70,333 @@ class GraphQLErrorsException(Exception):
         )
 
 
-def graphql(query, variables: T.Optional[dict] = None, *, raise_graphql_errors=True):
-    config = get_config()
-    account = account_ctx.get()
-    token = (
-        config["github"]["primaryToken"]
-        if account == "primary"
-        else config["github"]["secondaryToken"]
+def _http_config() -> dict:
+    return get_config()["github"].get("http", {})
+
+
+def _timeout() -> T.Tuple[float, float]:
+    http = _http_config()
+    return (
+        http.get("connectTimeout", DEFAULT_CONNECT_TIMEOUT),
+        http.get("readTimeout", DEFAULT_READ_TIMEOUT),
     )
-    res = requests.post(
-        "https://api.github.com/graphql",
-        headers={
-            "Authorization": f"Bearer {token}",
-        },
-        data=json.dumps(
-            {
-                "query": query,
-                "variables": variables or {},
-            }
+
+
+def _account_tokens(account: str) -> T.List[str]:
+    config = get_config()["github"]
+    role = "primary" if account == "primary" else "secondary"
+    if config.get(f"{role}Tokens"):
+        return config[f"{role}Tokens"]
+    return [config[f"{role}Token"]]
+
+
+def token_fingerprint(account: T.Optional[str] = None) -> str:
+    """
+    Get a fingerprint of the tokens of an account (defaults to the current
+    account from ``account_ctx``), e.g., to key cached data that depends on
+    what the tokens can access.
+    """
+    account = account or account_ctx.get()
+    return cache.fingerprint("\n".join(_account_tokens(account)))
+
+
+def get_token_pool(account: T.Optional[str] = None) -> tokens.TokenPool:
+    """
+    Get the token pool of an account (defaults to the current account from
+    ``account_ctx``).
+    """
+    account = account or account_ctx.get()
+    with _token_pools_lock:
+        pool = _token_pools.get(account)
+        if pool is None:
+            pool = tokens.TokenPool(
+                _account_tokens(account),
+                strategy=get_config()["github"].get(
+                    "tokenStrategy", tokens.ROUND_ROBIN
+                ),
+                get_rate_limiter=get_rate_limiter,
+            )
+            _token_pools[account] = pool
+        return pool
+
+
+def get_session(account: T.Optional[str] = None) -> requests.Session:
+    """
+    Get the persistent HTTP session for an account (defaults to the current
+    account from ``account_ctx``).
+
+    Sessions keep their connections to api.github.com alive between requests,
+    so only the first request for each account pays for the TCP and TLS
+    handshakes. Sessions are shared between all the tokens of an account (the
+    token is sent with every request). The connection pool size can be
+    configured with the ``github.http.poolSize`` setting (it should be at
+    least as large as the number of requests that are made concurrently).
+    """
+    account = account or account_ctx.get()
+    with _sessions_lock:
+        session = _sessions.get(account)
+        if session is None:
+            pool_size = _http_config().get("poolSize", DEFAULT_POOL_SIZE)
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=pool_size,
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            _sessions[account] = session
+        return session
+
+
+@atexit.register
+def close_sessions() -> None:
+    """
+    Close all open HTTP sessions (and their pooled connections).
+
+    This is called automatically when the interpreter exits. A new session is
+    created transparently if a request is made afterwards.
+    """
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+def _rate_limit_config() -> dict:
+    return get_config()["github"].get("rateLimit", {})
+
+
+def get_rate_limiter(token: str) -> ratelimit.RateLimiter:
+    """
+    Get the rate limiter for a token.
+    """
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(token)
+        if limiter is None:
+            limiter = ratelimit.RateLimiter.from_config(_rate_limit_config())
+            _rate_limiters[token] = limiter
+        return limiter
+
+
+def rate_limit_budget(account: T.Optional[str] = None) -> ratelimit.Budget:
+    """
+    Get the last known rate limit budget for an account (the total of all its
+    tokens).
+
+    The budget is updated from every response, so this doesn't make any
+    requests (use ``query_rate_limit`` to fetch the budget explicitly).
+    """
+    pool = get_token_pool(account)
+    return ratelimit.Budget.combine(
+        [get_rate_limiter(token).budget for token in pool.tokens]
+    )
+
+
+def _is_rate_limited(payload: dict) -> bool:
+    return any(
+        error.get("type") == "RATE_LIMITED" for error in payload.get("errors") or []
+    )
+
+
+def _request(
+    method: str, url: str, *, mutation: bool = False, **kwargs
+) -> T.Tuple[requests.Response, ratelimit.RateLimiter]:
+    """
+    Send a request with a token of the current account, pacing it according
+    to the token's rate limiter and waiting out any rate limit errors.
+
+    Returns the response and the rate limiter of the token that was used.
+    """
+    pool = get_token_pool()
+    max_waits = _rate_limit_config().get("maxWaits", DEFAULT_MAX_RATE_LIMIT_WAITS)
+    waits = 0
+    while True:
+        with pool.checkout(token_ctx.get()) as token:
+            limiter = get_rate_limiter(token)
+            limiter.acquire(mutation=mutation)
+            res = get_session().request(
+                method,
+                url,
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=_timeout(),
+                **kwargs,
+            )
+        limiter.update_from_headers(res.headers)
+        wait = ratelimit.retry_after(res.status_code, res.headers, res.text)
+        if wait is None or waits >= max_waits:
+            return res, limiter
+        waits += 1
+        print(f"Rate limited by GitHub, waiting {wait:.0f}s before retrying")
+        limiter.pause(wait)
+
+
+def get_retry_policy() -> retry.RetryPolicy:
+    return retry.RetryPolicy.from_config(get_config()["github"].get("retry", {}))
+
+
+def graphql(
+    query: T.Union[str, Document],
+    variables: T.Optional[dict] = None,
+    *,
+    raise_graphql_errors=True,
+    recover: T.Optional[T.Callable[[], T.Optional[dict]]] = None,
+    projection: str = FULL,
+):
+    """
+    Execute a GraphQL query (or mutation).
+
+    The query is compiled (see ``gh.query``) before it is sent, so it may use
+    any registered fragment without including its definition. ``projection``
+    selects the variant of the fragments that the query spreads directly.
+
+    Transient errors are retried according to the retry policy. Mutations that
+    aren't idempotent (see ``gh.retry``) are only retried if ``recover`` is
+    given: it is called before every retry and should return the payload of
+    the mutation if it was already applied by a previous attempt (or ``None``
+    if it wasn't, in which case the mutation is sent again).
+    """
+    document = (
+        query if isinstance(query, Document) else compile_query(query, projection)
+    )
+    return _with_retries(
+        lambda: _graphql(
+            document,
+            variables,
+            source=str(query),
+            raise_graphql_errors=raise_graphql_errors,
         ),
+        idempotent=retry.is_idempotent(document.text),
+        recover=recover,
     )
-    res.raise_for_status()
-    payload = res.json()
+
+
+def _with_retries(
+    send: T.Callable[[], R],
+    *,
+    idempotent: bool,
+    recover: T.Optional[T.Callable[[], T.Optional[R]]] = None,
+) -> R:
+    policy = get_retry_policy()
+    attempt = 0
+    while True:
+        try:
+            return send()
+        except Exception as e:
+            if (
+                attempt + 1 >= policy.max_attempts
+                or not policy.is_retryable(e)
+                or not (idempotent or recover)
+            ):
+                raise
+            delay = policy.delay(attempt)
+            print(f"Request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+            if recover:
+                payload = recover()
+                if payload is not None:
+                    return payload
+
+
+def rest(
+    method: str,
+    path: str,
+    body: T.Optional[dict] = None,
+    *,
+    idempotent: T.Optional[bool] = None,
+) -> T.Any:
+    """
+    Make a request to the GitHub REST API (e.g., ``/repos/{owner}/{name}``).
+
+    Requests are made with the same sessions, tokens, rate limiting and retry
+    policy as GraphQL requests. Requests other than ``GET``, ``PUT``,
+    ``PATCH`` and ``DELETE`` are only retried if ``idempotent`` is true.
+    """
+    if idempotent is None:
+        idempotent = method in ("GET", "PUT", "PATCH", "DELETE")
+
+    def send():
+        res, _ = _request(
+            method,
+            REST_URL + path,
+            mutation=method != "GET",
+            json=body,
+        )
+        res.raise_for_status()
+        return res.json() if res.content else None
+
+    return _with_retries(send, idempotent=idempotent)
+
+
+def _graphql(
+    document: Document,
+    variables: T.Optional[dict],
+    *,
+    source: str,
+    raise_graphql_errors: bool,
+):
+    max_waits = _rate_limit_config().get("maxWaits", DEFAULT_MAX_RATE_LIMIT_WAITS)
+    waits = 0
+    while True:
+        res, limiter = _request(
+            "POST",
+            GRAPHQL_URL,
+            mutation=document.operation_type == "mutation",
+            data=json.dumps(
+                {
+                    "query": document.text,
+                    "variables": variables or {},
+                }
+            ),
+        )
+        res.raise_for_status()
+        payload = res.json()
+        rate_limit = (payload.get("data") or {}).get("rateLimit")
+        if rate_limit:
+            limiter.update_from_rate_limit(rate_limit)
+        if not _is_rate_limited(payload) or waits >= max_waits:
+            break
+        # The primary budget is exhausted: wait until it resets.
+        waits += 1
+        wait = limiter.budget.seconds_until_reset() or ratelimit.DEFAULT_SECONDARY_WAIT
+        print(f"GitHub rate limit exhausted, waiting {wait:.0f}s before retrying")
+        limiter.pause(wait)
     if raise_graphql_errors and payload.get("errors", None):
-        raise GraphQLErrorsException(payload["errors"], query)
+        raise GraphQLErrorsException(payload["errors"], source)
     return payload
 
 
+def query_rate_limit() -> ratelimit.Budget:
+    """
+    Fetch the current rate limit budget of (every token of) the current
+    account from GitHub.
+    """
+    for token in get_token_pool().tokens:
+        with github_account(account_ctx.get(), token=token):
+            graphql(
+                """
+                query {
+                    rateLimit {
+                        limit
+                        cost
+                        remaining
+                        used
+                        resetAt
+                    }
+                }
+                """
+            )
+    return rate_limit_budget()
+
+
 def query_viewer_login(account="primary") -> str:
-    return graphql(
-        """
-        query {
-            viewer {
-                login
+    with github_account(account):
+        return graphql(
+            """
+            query {
+                viewer {
+                    login
+                }
             }
-        }
-        """,
-        account=account,
-    )["data"]["viewer"]["login"]
+            """,
+        )["data"]["viewer"]["login"]
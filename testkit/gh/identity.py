@@ -0,0 +1,143 @@
+"""
+An optional identity map for the objects decoded from GraphQL (commits, refs
+and PRs), keyed by their node id.
+
+Outside of a session, every ``from_graphql`` call returns a new object. Within
+a session, a node that was already decoded resolves to the same instance,
+which is updated in place with the newly fetched fields:
+
+    with gh.identity.session():
+        prs = gh.pr.list_repo_pull_requests(repo.id)
+        # The base commit shared by a stack is a single object.
+        ...
+        # Refresh the PRs in place (e.g., their state).
+        gh.pr.list_repo_pull_requests(repo.id, projection=gh.query.MINIMAL)
+
+Fields that a query didn't fetch (see ``gh.query``) keep their current value,
+while fields that were fetched as null are cleared.
+The session is stored in a context variable, so it applies to the calls made
+by ``gh.aio`` and ``gh.utils.thread_map`` as well.
+"""
+import contextlib
+import contextvars
+import dataclasses
+import functools
+import threading
+import typing as T
+
+from .utils import NOT_FETCHED
+
+X = T.TypeVar("X")
+
+_current: contextvars.ContextVar[T.Optional["IdentityMap"]] = contextvars.ContextVar(
+    "identity_map", default=None
+)
+
+
+class IdentityMap:
+    def __init__(self):
+        self._objects: T.Dict[T.Tuple[type, str], T.Any] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def get(self, cls: T.Type[X], id: str) -> T.Optional[X]:
+        return self._objects.get((cls, id))
+
+    def add(self, obj: X) -> X:
+        """
+        Add an object to the map, or update the object with the same id that
+        is already in the map (and return it). Fields of ``obj`` that are
+        ``NOT_FETCHED`` are left as they are.
+        """
+        key = (type(obj), obj.id)
+        with self._lock:
+            existing = self._objects.setdefault(key, obj)
+            if existing is obj:
+                _clear_not_fetched(obj)
+            else:
+                _update(existing, obj)
+        return existing
+
+    def clear(self) -> None:
+        with self._lock:
+            self._objects.clear()
+
+    def decode(self, fn: T.Callable[[T.Any], X], data: T.Any) -> X:
+        """
+        Call ``fn`` (a ``from_graphql`` method) with this map as the current
+        one.
+        """
+        token = _current.set(self)
+        try:
+            return fn(data)
+        finally:
+            _current.reset(token)
+
+
+def current() -> T.Optional[IdentityMap]:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def session(
+    identity_map: T.Optional[IdentityMap] = None,
+) -> T.Iterator[IdentityMap]:
+    """
+    Use an identity map (a new one by default) within the block.
+    """
+    identity_map = identity_map if identity_map is not None else IdentityMap()
+    token = _current.set(identity_map)
+    try:
+        yield identity_map
+    finally:
+        _current.reset(token)
+
+
+def register(obj: X) -> X:
+    """
+    Get the shared instance of an object that was just decoded (i.e., the
+    object itself outside of a session).
+    """
+    identity_map = _current.get()
+    if identity_map is None:
+        _clear_not_fetched(obj)
+        return obj
+    return identity_map.add(obj)
+
+
+def bind(fn: T.Callable[[T.Any], X]) -> T.Callable[[T.Any], X]:
+    """
+    Bind a decoder to the current identity map, so that nested objects that
+    are decoded lazily (see ``gh.utils.Lazy``) resolve to the same instances
+    even once the session is over.
+    """
+    identity_map = _current.get()
+    if identity_map is None:
+        return fn
+    decode = functools.partial(identity_map.decode, fn)
+    return functools.update_wrapper(decode, fn)
+
+
+def _clear_not_fetched(obj: T.Any) -> None:
+    # Fields that weren't fetched are None outside of the map.
+    for field in _fields(type(obj)):
+        if field.init and getattr(obj, field.name) is NOT_FETCHED:
+            setattr(obj, field.name, field.default)
+
+
+def _update(existing: T.Any, new: T.Any) -> None:
+    for field in _fields(type(existing)):
+        if field.init:
+            value = getattr(new, field.name)
+            if value is not NOT_FETCHED:
+                setattr(existing, field.name, value)
+        elif field.default is not dataclasses.MISSING:
+            # Reset derived fields (e.g., caches of the updated fields).
+            setattr(existing, field.name, field.default)
+
+
+@functools.lru_cache(maxsize=None)
+def _fields(cls: type) -> T.Tuple[dataclasses.Field, ...]:
+    return dataclasses.fields(cls)
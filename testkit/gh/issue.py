@@ -1,7 +1,7 @@
 import dataclasses
-import textwrap
 import typing as T
 
+from gh import query
 from gh.github import graphql
 
 
@@ -15,7 +15,7 @@ class IssueComment:
     class Author:
         login: str
 
-    FRAGMENT = textwrap.dedent(
+    FRAGMENT = query.fragment(
         """
         fragment IssueComment on IssueComment {
             id
@@ -50,8 +50,7 @@ def add_comment(subject_id: str, body: str) -> "IssueComment":
                 }
             }
         }
-        """
-        + IssueComment.FRAGMENT,
+        """,
         {
             "input": {
                 "subjectId": subject_id,
@@ -1,30 +1,92 @@
 import dataclasses
 import typing as T
 
+from . import identity, query
 from .ref import Ref
 from .github import graphql
-from .repo import Label
-from .utils import iter_connection
+from .repo import Label, iter_labels
+from .utils import NOT_FETCHED, Lazy, lazy_attribute, lazy_repr, paginate
 
 
 STATE_OPEN = "OPEN"
 STATE_CLOSED = "CLOSED"
 STATE_MERGED = "MERGED"
 
+REVIEW_STATE_APPROVED = "APPROVED"
 
-@dataclasses.dataclass
+
+@dataclasses.dataclass(slots=True)
 class PullRequest:
     id: str
     number: int
     state: str
     permalink: str
-    head_ref: "Ref"
-    labels: T.List["Label"]
+    # These fields are only fetched by some projections (see gh.query).
+    review_decision: T.Optional[str] = None
+    _head_ref: T.Union[Lazy, "Ref", None] = dataclasses.field(
+        default=None, repr=False
+    )
+    _labels: T.Union[Lazy, T.List["Label"], None] = dataclasses.field(
+        default=None, repr=False
+    )
+    # The latest review by the account that fetched the PR.
+    _viewer_latest_review: T.Union[Lazy, "PullRequestReview", None] = (
+        dataclasses.field(default=None, repr=False)
+    )
+    _label_names: T.Optional[T.FrozenSet[str]] = dataclasses.field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    # Decoded on first access.
+    head_ref = lazy_attribute("_head_ref")
+    labels = lazy_attribute("_labels")
+    viewer_latest_review = lazy_attribute("_viewer_latest_review")
+
+    __repr__ = lazy_repr
 
     def has_label(self, label: str) -> bool:
-        return label in [l.name for l in self.labels]
+        if self._label_names is None:
+            if self.labels is None:
+                raise ValueError(f"Labels of PR #{self.number} were not fetched")
+            self._label_names = frozenset(l.name for l in self.labels)
+        return label in self._label_names
+
+    def is_approved_by_viewer(self) -> bool:
+        return (
+            self.viewer_latest_review is not None
+            and self.viewer_latest_review.state == REVIEW_STATE_APPROVED
+        )
+
+    FRAGMENT_MINIMAL = query.fragment(
+        """
+        fragment PullRequestMinimal on PullRequest {
+            id
+            number
+            state
+            permalink
+        }
+        """
+    )
 
-    FRAGMENT = (
+    FRAGMENT_STANDARD = query.fragment(
+        """
+        fragment PullRequestStandard on PullRequest {
+            id
+            number
+            state
+            permalink
+            headRef { ...RefMinimal }
+            labels(first: 100) {
+              pageInfo { ...PageInfo }
+              nodes { ...Label }
+            }
+            reviewDecision
+            viewerLatestReview { ...PullRequestReview }
+        }
+        """
+    )
+
+    FRAGMENT = query.fragment(
         """
         fragment PullRequest on PullRequest {
             id
@@ -32,38 +94,51 @@ class PullRequest:
             state
             permalink
             headRef { ...Ref }
-            labels(first: 50) {
+            labels(first: 100) {
+              pageInfo { ...PageInfo }
               nodes { ...Label }
             }
+            reviewDecision
+            viewerLatestReview { ...PullRequestReview }
         }
-        """
-        + Ref.FRAGMENT
-        + Label.FRAGMENT
+        """,
+        projections={
+            query.MINIMAL: "PullRequestMinimal",
+            query.STANDARD: "PullRequestStandard",
+        },
     )
 
     @classmethod
     def from_graphql(cls, data: T.Dict[str, T.Any]) -> "PullRequest":
-        return cls(
-            id=data["id"],
-            number=data["number"],
-            state=data["state"],
-            permalink=data["permalink"],
-            head_ref=Ref.from_graphql(data["headRef"]) if data["headRef"] else None,
-            labels=[Label.from_graphql(label) for label in data["labels"]["nodes"]],
+        return identity.register(
+            cls(
+                id=data["id"],
+                number=data["number"],
+                state=data["state"],
+                permalink=data["permalink"],
+                review_decision=data.get("reviewDecision", NOT_FETCHED),
+                _head_ref=Lazy.field(data, "headRef", identity.bind(Ref.from_graphql)),
+                _labels=Lazy.field(data, "labels", Label.from_graphql, many=True),
+                _viewer_latest_review=Lazy.field(
+                    data, "viewerLatestReview", PullRequestReview.from_graphql
+                ),
+            )
         )
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class PullRequestReview:
     id: str
     state: str
 
-    FRAGMENT = """
-    fragment PullRequestReview on PullRequestReview {
-        id
-        state
-    }
-    """
+    FRAGMENT = query.fragment(
+        """
+        fragment PullRequestReview on PullRequestReview {
+            id
+            state
+        }
+        """
+    )
 
     @classmethod
     def from_graphql(cls, data: T.Dict[str, T.Any]) -> "PullRequestReview":
@@ -73,6 +148,18 @@ class PullRequestReview:
         )
 
 
+def _decode(data: T.Dict[str, T.Any]) -> PullRequest:
+    """
+    Decode a PR, fetching the rest of its labels if they didn't all fit in the
+    first page.
+    """
+    pr = PullRequest.from_graphql(data)
+    labels = data.get("labels")
+    if labels and labels["pageInfo"]["hasNextPage"]:
+        pr.labels = list(iter_labels(pr.id, first_page=labels))
+    return pr
+
+
 def create_pull_request(
     repo_id: str,
     title: str,
@@ -80,7 +167,15 @@ def create_pull_request(
     head_branch_name: str,
     *,
     body: str = "",
+    projection: str = query.FULL,
 ) -> PullRequest:
+    def recover() -> T.Optional[dict]:
+        # The PR may have been created by an attempt that failed in transit.
+        pr = _query_open_pull_request(repo_id, base_branch_name, head_branch_name)
+        if pr and pr["title"] == title:
+            return {"data": {"createPullRequest": {"pullRequest": pr}}}
+        return None
+
     res = graphql(
         """
         mutation CreatePullRequest(
@@ -92,8 +187,7 @@ def create_pull_request(
                 }
             }
         }
-        """
-        + PullRequest.FRAGMENT,
+        """,
         variables={
             "input": {
                 "repositoryId": repo_id,
@@ -103,43 +197,111 @@ def create_pull_request(
                 "headRefName": f"refs/heads/{head_branch_name}",
             },
         },
+        recover=recover,
+        projection=projection,
     )
-    return PullRequest.from_graphql(res["data"]["createPullRequest"]["pullRequest"])
+    return _decode(res["data"]["createPullRequest"]["pullRequest"])
 
 
-def list_repo_pull_requests(
-    repo_id: str, *, states: T.List[str] = None
-) -> T.List[PullRequest]:
+def _query_open_pull_request(
+    repo_id: str, base_branch_name: str, head_branch_name: str
+) -> T.Optional[dict]:
     res = graphql(
         """
-        query ListRepositoryPullRequests($id: ID!, $states: [PullRequestState!]) {
+        query FindOpenPullRequest($id: ID!, $base: String!, $head: String!) {
             node(id: $id) {
                 ... on Repository {
-                    pullRequests(first: 100, states: $states) {
-                        edges { 
-                            node {
-                                ...PullRequest
-                            }
+                    pullRequests(
+                        first: 1,
+                        baseRefName: $base,
+                        headRefName: $head,
+                        states: [OPEN],
+                    ) {
+                        nodes {
+                            title
+                            ...PullRequest
                         }
                     }
                 }
             }
         }
-        """
-        + PullRequest.FRAGMENT,
+        """,
         variables={
             "id": repo_id,
-            "states": states,
+            "base": base_branch_name,
+            "head": head_branch_name,
         },
     )
+    nodes = res["data"]["node"]["pullRequests"]["nodes"]
+    return nodes[0] if nodes else None
+
+
+def list_repo_pull_requests(
+    repo_id: str,
+    *,
+    states: T.List[str] = None,
+    projection: str = query.FULL,
+) -> T.List[PullRequest]:
+    return list(
+        iter_repo_pull_requests(repo_id, states=states, projection=projection)
+    )
 
-    return [
-        PullRequest.from_graphql(d)
-        for d in iter_connection(res["data"]["node"]["pullRequests"])
-    ]
 
+def iter_repo_pull_requests(
+    repo_id: str,
+    *,
+    states: T.List[str] = None,
+    projection: str = query.FULL,
+    page_size: int = 100,
+    prefetch: bool = False,
+) -> T.Iterator[PullRequest]:
+    """
+    Iterate over all the PRs of a repository, fetching them a page at a time.
+
+    :param prefetch: If true, fetch the next page in the background while the
+        current page is consumed.
+    """
 
-def get_repo_pull_request(repo_id: str, number: int) -> PullRequest:
+    def fetch_page(cursor: T.Optional[str]) -> dict:
+        res = graphql(
+            """
+            query ListRepositoryPullRequests(
+                $id: ID!
+                $states: [PullRequestState!]
+                $first: Int!
+                $after: String
+            ) {
+                node(id: $id) {
+                    ... on Repository {
+                        pullRequests(first: $first, after: $after, states: $states) {
+                            pageInfo { ...PageInfo }
+                            edges {
+                                node {
+                                    ...PullRequest
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+            """,
+            variables={
+                "id": repo_id,
+                "states": states,
+                "first": page_size,
+                "after": cursor,
+            },
+            projection=projection,
+        )
+        return res["data"]["node"]["pullRequests"]
+
+    for d in paginate(fetch_page, prefetch=prefetch):
+        yield _decode(d)
+
+
+def get_repo_pull_request(
+    repo_id: str, number: int, *, projection: str = query.FULL
+) -> PullRequest:
     res = graphql(
         """
         query GetRepositoryPullRequest($id: ID!, $number: Int!) {
@@ -151,17 +313,59 @@ def get_repo_pull_request(repo_id: str, number: int) -> PullRequest:
                 }
             }
         }
-        """
-        + PullRequest.FRAGMENT,
+        """,
         variables={
             "id": repo_id,
             "number": number,
         },
+        projection=projection,
     )
-    return PullRequest.from_graphql(res["data"]["node"]["pullRequest"])
+    return _decode(res["data"]["node"]["pullRequest"])
 
 
-def close_pull_request(pr_id: str) -> PullRequest:
+def get_repo_pull_requests(
+    repo_id: str,
+    numbers: T.List[int],
+    *,
+    projection: str = query.FULL,
+    max_size: int = 100,
+) -> T.List[PullRequest]:
+    """
+    Get several PRs of a repository by number (in the same order as
+    ``numbers``), fetching up to ``max_size`` PRs per request.
+    """
+    prs = []
+    for start in range(0, len(numbers), max_size):
+        chunk = numbers[start : start + max_size]
+        # Aliases only depend on the position of the PR in the query so that
+        # lookups of the same number of PRs compile to the same document.
+        params = "".join(f", $number{i}: Int!" for i in range(len(chunk)))
+        fields = "\n".join(
+            f"pr{i}: pullRequest(number: $number{i}) {{ ...PullRequest }}"
+            for i in range(len(chunk))
+        )
+        res = graphql(
+            f"""
+            query GetRepositoryPullRequests($id: ID!{params}) {{
+                node(id: $id) {{
+                    ... on Repository {{
+                        {fields}
+                    }}
+                }}
+            }}
+            """,
+            variables={
+                "id": repo_id,
+                **{f"number{i}": number for i, number in enumerate(chunk)},
+            },
+            projection=projection,
+        )
+        node = res["data"]["node"]
+        prs.extend(_decode(node[f"pr{i}"]) for i in range(len(chunk)))
+    return prs
+
+
+def close_pull_request(pr_id: str, *, projection: str = query.FULL) -> PullRequest:
     res = graphql(
         """
         mutation ClosePullRequest($input: ClosePullRequestInput!) {
@@ -171,15 +375,15 @@ def close_pull_request(pr_id: str) -> PullRequest:
                 }
             }
         }
-        """
-        + PullRequest.FRAGMENT,
+        """,
         variables={
             "input": {
                 "pullRequestId": pr_id,
             },
         },
+        projection=projection,
     )
-    return PullRequest.from_graphql(res["data"]["closePullRequest"]["pullRequest"])
+    return _decode(res["data"]["closePullRequest"]["pullRequest"])
 
 
 def add_labels(id: str, label_ids: T.List[str]):
@@ -261,8 +465,7 @@ def add_pull_request_review(
                 }
             }
         }
-        """
-        + PullRequestReview.FRAGMENT,
+        """,
         variables={
             "input": {
                 "pullRequestId": pull_request_id,
@@ -0,0 +1,95 @@
+import contextlib
+import threading
+import time
+import typing as T
+
+
+class Progress:
+    """
+    Thread-safe progress reporting for long-running bulk operations.
+
+    Prints the number of completed (and failed) items and the throughput at
+    most once every ``interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        total: T.Optional[int] = None,
+        *,
+        interval: float = 1.0,
+    ):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+        self._printed_at = self.started_at
+        self._lock = threading.Lock()
+
+    def update(self, done: int = 1, *, failed: int = 0) -> None:
+        with self._lock:
+            self.done += done
+            self.failed += failed
+            now = time.monotonic()
+            if now - self._printed_at < self.interval:
+                return
+            self._printed_at = now
+        print(self.summary())
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        total = f"/{self.total}" if self.total is not None else ""
+        failed = f", {self.failed} failed" if self.failed else ""
+        return f"{self.label}: {self.done}{total}{failed} ({self.rate():.1f}/s)"
+
+    def finish(self) -> None:
+        elapsed = time.monotonic() - self.started_at
+        print(f"{self.summary()} in {elapsed:.1f}s")
+
+
+class StageStats:
+    """
+    Thread-safe collection of the latencies of the stages of a pipeline.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self._durations: T.Dict[str, T.List[float]] = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def time(self, stage: str) -> T.Iterator[None]:
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(stage, time.monotonic() - started_at)
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._durations.setdefault(stage, []).append(seconds)
+
+    def report(self) -> str:
+        with self._lock:
+            durations = {k: sorted(v) for k, v in self._durations.items()}
+        lines = [
+            f"{'stage':<12} {'count':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}"
+        ]
+        for stage, values in durations.items():
+            lines.append(
+                f"{stage:<12} {len(values):>6} "
+                f"{sum(values) / len(values):>7.2f}s "
+                f"{_percentile(values, 0.5):>7.2f}s "
+                f"{_percentile(values, 0.95):>7.2f}s "
+                f"{values[-1]:>7.2f}s"
+            )
+        return "\n".join(lines)
+
+
+def _percentile(sorted_values: T.List[float], q: float) -> float:
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
@@ -0,0 +1,210 @@
+"""
+Compilation of GraphQL documents.
+
+Fragments are registered once (``fragment``) and referenced by name from
+queries. ``compile`` turns the source of a query into the document that is
+sent to GitHub: it resolves the fragments the query uses (recursively),
+includes every fragment exactly once, and strips insignificant whitespace.
+Compiled documents are cached, so this work is only done once per query.
+
+Every compiled document has a stable hash of its text, which can be used to
+identify the query (e.g., for persisted queries or for logging).
+
+Fragments can have projections: smaller variants of the fragment that select
+fewer fields (e.g., ``PullRequestMinimal`` only selects the id and number of
+a PR). When a query is compiled for a projection, the fragments that the
+operation spreads directly are replaced with their variant for that
+projection, so a single query can fetch as little (or as much) data as the
+caller needs.
+"""
+import dataclasses
+import functools
+import hashlib
+import re
+import typing as T
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ignored>[\s,]+|\#[^\n]*)
+    |(?P<string>"(?:\\.|[^"\\])*")
+    |(?P<spread>\.\.\.)
+    |(?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+    |(?P<name>[_A-Za-z][_0-9A-Za-z]*)
+    |(?P<punctuator>[!$&()\:=@\[\]{|}])
+    """,
+    re.VERBOSE,
+)
+
+# Fetch only the identifying fields of an object (e.g., id and number).
+MINIMAL = "minimal"
+# Fetch the fields of an object, but only the minimal fields of nested objects.
+STANDARD = "standard"
+# Fetch everything (including nested objects).
+FULL = "full"
+PROJECTIONS = (MINIMAL, STANDARD, FULL)
+
+_registry: T.Dict[str, T.List[str]] = {}
+_projections: T.Dict[str, T.Dict[str, str]] = {}
+
+
+@dataclasses.dataclass(frozen=True)
+class Document:
+    text: str
+    operation_type: str
+    hash: str
+
+    def __str__(self):
+        return self.text
+
+
+def tokenize(source: str) -> T.List[str]:
+    tokens = []
+    pos = 0
+    while pos < len(source):
+        match = _TOKEN_RE.match(source, pos)
+        if not match:
+            raise ValueError(f"Invalid GraphQL at {pos}: {source[pos:pos + 20]!r}")
+        if match.lastgroup != "ignored":
+            tokens.append(match.group())
+        pos = match.end()
+    return tokens
+
+
+def _is_word(token: str) -> bool:
+    return token[0] == '"' or token[0] == "_" or token[0].isalnum() or token[0] == "-"
+
+
+def _join(tokens: T.List[str]) -> str:
+    """
+    Join tokens with as little whitespace as possible.
+    """
+    out = []
+    prev = None
+    for token in tokens:
+        if prev is not None and _is_word(prev) and _is_word(token):
+            out.append(" ")
+        out.append(token)
+        prev = token
+    return "".join(out)
+
+
+def minify(source: str) -> str:
+    return _join(tokenize(source))
+
+
+def _split_definitions(tokens: T.List[str]) -> T.List[T.List[str]]:
+    """
+    Split a document into its top-level definitions.
+    """
+    definitions = []
+    current: T.List[str] = []
+    depth = 0
+    for token in tokens:
+        current.append(token)
+        if token == "{":
+            depth += 1
+        elif token == "}":
+            depth -= 1
+            if depth == 0:
+                definitions.append(current)
+                current = []
+    if current or depth:
+        raise ValueError(f"Unbalanced GraphQL document: {_join(tokens)!r}")
+    return definitions
+
+
+def _fragment_name(definition: T.List[str]) -> T.Optional[str]:
+    return definition[1] if definition[0] == "fragment" else None
+
+
+def _spreads(definition: T.List[str]) -> T.Iterator[str]:
+    for i, token in enumerate(definition[:-1]):
+        if token == "..." and definition[i + 1] not in ("on", "{", "@"):
+            yield definition[i + 1]
+
+
+def fragment(
+    source: str, *, projections: T.Optional[T.Dict[str, str]] = None
+) -> str:
+    """
+    Register the fragment(s) defined by ``source`` so that queries can use
+    them without including their definitions. Returns ``source`` unchanged.
+
+    :param projections: The names of the (separately registered) variants of
+        the fragment to use for each projection.
+    """
+    for definition in _split_definitions(tokenize(source)):
+        name = _fragment_name(definition)
+        if not name:
+            raise ValueError(f"Not a fragment definition: {_join(definition)!r}")
+        _registry[name] = definition
+        if projections:
+            _projections[name] = projections
+    return source
+
+
+def projected(name: str, projection: str = FULL) -> str:
+    """
+    Get the name of the variant of a fragment for a projection.
+    """
+    if projection not in PROJECTIONS:
+        raise ValueError(
+            f"Unknown projection {projection!r} (expected one of {PROJECTIONS})"
+        )
+    return _projections.get(name, {}).get(projection, name)
+
+
+@functools.lru_cache(maxsize=1024)
+def compile(source: str, projection: str = FULL) -> Document:
+    """
+    Compile a query (or mutation) into the document to send to GitHub.
+
+    Fragments that are used but not defined in ``source`` are taken from the
+    registry. Fragments that are defined more than once (e.g., because
+    several fragments that include the same fragment were concatenated) are
+    only included once.
+
+    :param projection: The projection of the fragments that are spread
+        directly by the operation.
+    """
+    operations = []
+    local: T.Dict[str, T.List[str]] = {}
+    for definition in _split_definitions(tokenize(source)):
+        name = _fragment_name(definition)
+        if name:
+            local.setdefault(name, definition)
+        else:
+            operations.append(definition)
+    if len(operations) != 1:
+        raise ValueError(
+            f"Expected exactly one operation, found {len(operations)}: {source!r}"
+        )
+
+    # Depth-first so that fragments appear in a stable order.
+    used: T.Dict[str, T.List[str]] = {}
+
+    def resolve(definition: T.List[str]):
+        for name in _spreads(definition):
+            if name in used:
+                continue
+            fragment_definition = local.get(name) or _registry.get(name)
+            if fragment_definition is None:
+                raise ValueError(f"Unknown GraphQL fragment: {name}")
+            used[name] = fragment_definition
+            resolve(fragment_definition)
+
+    operation = operations[0]
+    if projection != FULL:
+        operation = [
+            projected(token, projection) if i and operation[i - 1] == "..." else token
+            for i, token in enumerate(operation)
+        ]
+    resolve(operation)
+
+    text = _join(operation + [t for d in used.values() for t in d])
+    first = operation[0]
+    return Document(
+        text=text,
+        operation_type="query" if first == "{" else first,
+        hash=hashlib.sha256(text.encode()).hexdigest(),
+    )
@@ -0,0 +1,247 @@
+"""
+Client-side pacing of requests to stay within GitHub's rate limits.
+
+GitHub enforces a primary rate limit (an hourly budget of points per token)
+and secondary rate limits (limits on bursts of requests, on the points that
+requests cost per minute and on content-creating requests such as mutations).
+Every token gets a ``RateLimiter`` which
+
+- paces requests with a token bucket, a bucket of secondary limit points
+  (a request costs 1 point, or 5 points if it's a mutation, however many
+  aliased mutations it has) and a separate, slower bucket for mutations,
+- tracks the budget that GitHub reports through the ``X-RateLimit-*``
+  headers and the GraphQL ``rateLimit`` field, and waits for the budget to
+  reset once it is exhausted, and
+- pauses all requests after GitHub responds with a rate limit error (honoring
+  ``Retry-After``).
+"""
+import dataclasses
+import datetime
+import threading
+import time
+import typing as T
+
+DEFAULT_REQUESTS_PER_SECOND = 10.0
+DEFAULT_BURST = 10
+# GitHub allows 900 points per minute for the REST API (and 2000 for the
+# GraphQL API).
+DEFAULT_POINTS_PER_MINUTE = 900.0
+DEFAULT_POINTS_BURST = 100
+# The secondary limit points of a request.
+QUERY_POINTS = 1
+MUTATION_POINTS = 5
+# GitHub recommends no more than 80 content-creating requests per minute.
+DEFAULT_MUTATIONS_PER_MINUTE = 80.0
+DEFAULT_MUTATION_BURST = 10
+# How long to wait after a secondary rate limit error that doesn't specify
+# how long to wait for.
+DEFAULT_SECONDARY_WAIT = 60.0
+
+
+@dataclasses.dataclass
+class Budget:
+    limit: T.Optional[int] = None
+    remaining: T.Optional[int] = None
+    used: T.Optional[int] = None
+    reset_at: T.Optional[float] = None
+    last_cost: T.Optional[int] = None
+    paused_until: T.Optional[float] = None
+
+    @classmethod
+    def combine(cls, budgets: T.Sequence["Budget"]) -> "Budget":
+        """
+        Combine the budgets of several tokens into the total budget.
+        """
+
+        def total(values):
+            values = [v for v in values if v is not None]
+            return sum(values) if values else None
+
+        def earliest(values):
+            values = [v for v in values if v is not None]
+            return min(values) if values else None
+
+        return cls(
+            limit=total(b.limit for b in budgets),
+            remaining=total(b.remaining for b in budgets),
+            used=total(b.used for b in budgets),
+            reset_at=earliest(b.reset_at for b in budgets),
+            paused_until=(
+                # Only paused if every token is paused.
+                min(b.paused_until for b in budgets)
+                if all(b.paused_until for b in budgets)
+                else None
+            ),
+        )
+
+    def seconds_until_reset(self) -> T.Optional[float]:
+        if self.reset_at is None:
+            return None
+        return max(self.reset_at - time.time(), 0.0)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        """
+        :param rate: The number of tokens added per second (0 means unlimited).
+        :param capacity: The maximum number of tokens (i.e., the burst size).
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, n: float = 1) -> float:
+        """
+        Take ``n`` tokens from the bucket and return the number of seconds to
+        wait before they may be used.
+        """
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= n
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        *,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        burst: int = DEFAULT_BURST,
+        points_per_minute: float = DEFAULT_POINTS_PER_MINUTE,
+        points_burst: int = DEFAULT_POINTS_BURST,
+        mutations_per_minute: float = DEFAULT_MUTATIONS_PER_MINUTE,
+        mutation_burst: int = DEFAULT_MUTATION_BURST,
+        reserve: int = 0,
+    ):
+        """
+        :param reserve: The number of points of the primary budget to leave
+            unused. Once the remaining budget drops to this, requests wait for
+            the budget to reset.
+        """
+        self.requests = TokenBucket(requests_per_second, burst)
+        self.points = TokenBucket(points_per_minute / 60, points_burst)
+        self.mutations = TokenBucket(mutations_per_minute / 60, mutation_burst)
+        self.reserve = reserve
+        self._budget = Budget()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "RateLimiter":
+        return cls(
+            requests_per_second=config.get(
+                "requestsPerSecond", DEFAULT_REQUESTS_PER_SECOND
+            ),
+            burst=config.get("burst", DEFAULT_BURST),
+            points_per_minute=config.get(
+                "pointsPerMinute", DEFAULT_POINTS_PER_MINUTE
+            ),
+            points_burst=config.get("pointsBurst", DEFAULT_POINTS_BURST),
+            mutations_per_minute=config.get(
+                "mutationsPerMinute", DEFAULT_MUTATIONS_PER_MINUTE
+            ),
+            mutation_burst=config.get("mutationBurst", DEFAULT_MUTATION_BURST),
+            reserve=config.get("reserve", 0),
+        )
+
+    @property
+    def budget(self) -> Budget:
+        with self._lock:
+            return dataclasses.replace(self._budget)
+
+    def acquire(self, *, mutation: bool = False) -> None:
+        """
+        Block until a request may be sent.
+
+        A request counts once, even if it's a batch of (aliased) mutations,
+        since that's how GitHub counts it.
+        """
+        wait = max(
+            self.requests.reserve(),
+            self.points.reserve(MUTATION_POINTS if mutation else QUERY_POINTS),
+        )
+        if mutation:
+            wait = max(wait, self.mutations.reserve())
+        with self._lock:
+            now = time.time()
+            budget = self._budget
+            if budget.paused_until:
+                wait = max(wait, budget.paused_until - now)
+            if (
+                budget.remaining is not None
+                and budget.remaining <= self.reserve
+                and budget.reset_at
+            ):
+                wait = max(wait, budget.reset_at - now)
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Pause all requests for the given number of seconds.
+        """
+        with self._lock:
+            until = time.time() + seconds
+            self._budget.paused_until = max(self._budget.paused_until or 0, until)
+
+    def update_from_headers(self, headers: T.Mapping[str, str]) -> None:
+        if "X-RateLimit-Remaining" not in headers:
+            return
+        with self._lock:
+            budget = self._budget
+            budget.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Limit" in headers:
+                budget.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Used" in headers:
+                budget.used = int(headers["X-RateLimit-Used"])
+            if "X-RateLimit-Reset" in headers:
+                budget.reset_at = float(headers["X-RateLimit-Reset"])
+
+    def update_from_rate_limit(self, rate_limit: T.Mapping[str, T.Any]) -> None:
+        """
+        Update the budget from the GraphQL ``rateLimit`` object.
+        """
+        with self._lock:
+            budget = self._budget
+            if rate_limit.get("remaining") is not None:
+                budget.remaining = rate_limit["remaining"]
+            if rate_limit.get("limit") is not None:
+                budget.limit = rate_limit["limit"]
+            if rate_limit.get("used") is not None:
+                budget.used = rate_limit["used"]
+            if rate_limit.get("cost") is not None:
+                budget.last_cost = rate_limit["cost"]
+            if rate_limit.get("resetAt"):
+                budget.reset_at = parse_timestamp(rate_limit["resetAt"])
+
+
+def parse_timestamp(value: str) -> float:
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def retry_after(
+    status_code: int, headers: T.Mapping[str, str], body: str
+) -> T.Optional[float]:
+    """
+    Determine how long to wait if a response is a rate limit error.
+
+    Returns ``None`` if the response is not a rate limit error.
+    """
+    if status_code not in (403, 429):
+        return None
+    if "Retry-After" in headers:
+        return float(headers["Retry-After"])
+    if headers.get("X-RateLimit-Remaining") == "0" and "X-RateLimit-Reset" in headers:
+        return max(float(headers["X-RateLimit-Reset"]) - time.time(), 0.0) + 1
+    if "rate limit" in body.lower():
+        return DEFAULT_SECONDARY_WAIT
+    return None
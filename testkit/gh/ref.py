@@ -1,17 +1,48 @@
 import dataclasses
 import typing as T
 
+from . import identity, query
 from .commit import Commit
 from .github import graphql
+from .utils import Lazy, lazy_attribute, lazy_repr, paginate
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Ref:
     id: str
     name: str
-    target: "Commit"
+    # Not fetched by the minimal projection (see gh.query).
+    _target: T.Union[Lazy, "Commit", None] = dataclasses.field(
+        default=None, repr=False
+    )
+
+    # Decoded on first access.
+    target = lazy_attribute("_target")
+
+    __repr__ = lazy_repr
 
-    FRAGMENT = (
+    FRAGMENT_MINIMAL = query.fragment(
+        """
+        fragment RefMinimal on Ref {
+            name
+            id
+        }
+        """
+    )
+
+    FRAGMENT_STANDARD = query.fragment(
+        """
+        fragment RefStandard on Ref {
+            name
+            id
+            target {
+              ...CommitMinimal
+            }
+        }
+        """
+    )
+
+    FRAGMENT = query.fragment(
         """
         fragment Ref on Ref {
             name
@@ -21,21 +52,42 @@ class Ref:
               ...Commit
             }
         }
-        """
-        + Commit.FRAGMENT
+        """,
+        projections={
+            query.MINIMAL: "RefMinimal",
+            query.STANDARD: "RefStandard",
+        },
     )
 
     @classmethod
     def from_graphql(cls, data: dict):
-        return cls(
-            id=data["id"],
-            name=data["name"],
-            target=Commit.from_graphql(data["target"]),
+        return identity.register(
+            cls(
+                id=data["id"],
+                name=data["name"],
+                _target=Lazy.field(
+                    data, "target", identity.bind(Commit.from_graphql)
+                ),
+            )
         )
 
 
-def mutation_create_branch_ref(repo_id: str, branch_name: str, commit_id: str) -> Ref:
+def mutation_create_branch_ref(
+    repo_id: str,
+    branch_name: str,
+    commit_id: str,
+    *,
+    projection: str = query.FULL,
+) -> Ref:
     ref_name = f"refs/heads/{branch_name}"
+
+    def recover() -> T.Optional[dict]:
+        # The ref may have been created by an attempt that failed in transit.
+        ref = _query_ref(repo_id, ref_name)
+        if ref and ref["target"]["sha"] == commit_id:
+            return {"data": {"createRef": {"ref": ref}}}
+        return None
+
     res = graphql(
         """
         mutation CreateBranchRef($input: CreateRefInput!) {
@@ -43,8 +95,7 @@ def mutation_create_branch_ref(repo_id: str, branch_name: str, commit_id: str) -
                 ref { ...Ref }
             }
         }
-        """
-        + Ref.FRAGMENT,
+        """,
         variables={
             "input": {
                 "repositoryId": repo_id,
@@ -52,10 +103,33 @@ def mutation_create_branch_ref(repo_id: str, branch_name: str, commit_id: str) -
                 "oid": commit_id,
             },
         },
+        recover=recover,
+        projection=projection,
     )
     return Ref.from_graphql(res["data"]["createRef"]["ref"])
 
 
+def _query_ref(repo_id: str, qualified_name: str) -> T.Optional[dict]:
+    res = graphql(
+        """
+        query GetRef($repoId: ID!, $name: String!) {
+            node(id: $repoId) {
+                ... on Repository {
+                    ref(qualifiedName: $name) {
+                        ...Ref
+                    }
+                }
+            }
+        }
+        """,
+        variables={
+            "repoId": repo_id,
+            "name": qualified_name,
+        },
+    )
+    return res["data"]["node"]["ref"]
+
+
 def mutation_delete_ref(ref_id: str) -> None:
     graphql(
         """
@@ -78,26 +152,67 @@ def query_list_refs(
     query: T.Optional[str] = None,
     *,
     ref_prefix: str = "refs/heads/",
+    projection: str = query.FULL,
 ) -> T.List[Ref]:
-    res = graphql(
-        """
-        query ListRefs($repoId: ID!, $refPrefix: String!, $query: String) {
-            node(id: $repoId) {
-                ... on Repository {
-                    refs(first: 100, refPrefix: $refPrefix, query: $query) {
-                        nodes {
-                            ...Ref
+    return list(
+        iter_refs(repo_id, query, ref_prefix=ref_prefix, projection=projection)
+    )
+
+
+def iter_refs(
+    repo_id: str,
+    query: T.Optional[str] = None,
+    *,
+    ref_prefix: str = "refs/heads/",
+    projection: str = query.FULL,
+    page_size: int = 100,
+    prefetch: bool = False,
+) -> T.Iterator[Ref]:
+    """
+    Iterate over all the refs of a repository (that match ``query``),
+    fetching them a page at a time.
+
+    Use the minimal projection if only the id and name of the refs are needed
+    (e.g., to delete them).
+    """
+
+    def fetch_page(cursor: T.Optional[str]) -> dict:
+        res = graphql(
+            """
+            query ListRefs(
+                $repoId: ID!
+                $refPrefix: String!
+                $query: String
+                $first: Int!
+                $after: String
+            ) {
+                node(id: $repoId) {
+                    ... on Repository {
+                        refs(
+                            first: $first
+                            after: $after
+                            refPrefix: $refPrefix
+                            query: $query
+                        ) {
+                            pageInfo { ...PageInfo }
+                            nodes {
+                                ...Ref
+                            }
                         }
                     }
                 }
             }
-        }
-        """
-        + Ref.FRAGMENT,
-        variables={
-            "repoId": repo_id,
-            "refPrefix": ref_prefix,
-            "query": query,
-        },
-    )
-    return [Ref.from_graphql(ref) for ref in res["data"]["node"]["refs"]["nodes"]]
+            """,
+            variables={
+                "repoId": repo_id,
+                "refPrefix": ref_prefix,
+                "query": query,
+                "first": page_size,
+                "after": cursor,
+            },
+            projection=projection,
+        )
+        return res["data"]["node"]["refs"]
+
+    for ref in paginate(fetch_page, prefetch=prefetch):
+        yield Ref.from_graphql(ref)
@@ -1,17 +1,87 @@
 import dataclasses
+import threading
 import typing as T
 
-from .utils import iter_connection
-from .github import graphql
+from . import cache, config, query
+from .utils import paginate
+from .github import graphql, token_fingerprint
 
 
 @dataclasses.dataclass
 class Repo:
     id: str
     full_name: str
-    head_sha: str
     base_branch_name: str
     labels: T.List["Label"]
+    # The head of the base branch, which is fetched when it's first needed if
+    # the repo was loaded from the cache or the head expired (see
+    # ``head_sha``).
+    _head_sha: T.Optional[str] = dataclasses.field(default=None, repr=False)
+    _label_ids: T.Dict[str, str] = dataclasses.field(
+        init=False, repr=False, compare=False
+    )
+    _head_lock: threading.Lock = dataclasses.field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        self._label_ids = {label.name: label.id for label in self.labels}
+
+    @property
+    def head_sha(self) -> str:
+        """
+        The head of the base branch, which is fetched if it isn't known (only
+        once, even if several threads need it at the same time).
+
+        The head can change whenever it expires, so read it once into a
+        variable when the same SHA is needed more than once (e.g., for a
+        branch and its first commit).
+        """
+        head_sha = self._head_sha
+        if head_sha is None:
+            with self._head_lock:
+                head_sha = self._head_sha or self.refresh_head_sha()
+        return head_sha
+
+    def expire_head_sha(self) -> None:
+        """
+        Fetch the head of the base branch again when it's next needed (e.g.,
+        before every command of a long-lived process).
+        """
+        self._head_sha = None
+
+    def refresh_head_sha(self) -> str:
+        """
+        Fetch the current head of the base branch.
+        """
+        res = graphql(
+            """
+            query GetRepositoryHead($id: ID!) {
+                node(id: $id) {
+                    ... on Repository {
+                        defaultBranchRef {
+                            name
+                            target {
+                                oid
+                            }
+                        }
+                    }
+                }
+            }
+            """,
+            variables={"id": self.id},
+        )["data"]["node"]
+        self.base_branch_name = res["defaultBranchRef"]["name"]
+        self._head_sha = res["defaultBranchRef"]["target"]["oid"]
+        return self._head_sha
+
+    def refresh_labels(self) -> None:
+        """
+        Fetch the labels of the repo again (and update the cache).
+        """
+        self.labels = list(iter_labels(self.id))
+        self._label_ids = {label.name: label.id for label in self.labels}
+        _store(self)
 
     def resolve_label_id(self, name: str) -> str:
         """
@@ -20,23 +90,29 @@ class Repo:
         This is important since many places in the GraphQL API expect a label
         id, not just the name of the label.
         """
-        for label in self.labels:
-            if label.name == name:
-                return label.id
-        raise ValueError(f"Label {name} does not exist on repo {self.full_name}")
+        label_id = self._label_ids.get(name)
+        if label_id is None:
+            # The label may have been created since the labels were fetched.
+            self.refresh_labels()
+            label_id = self._label_ids.get(name)
+        if label_id is None:
+            raise ValueError(f"Label {name} does not exist on repo {self.full_name}")
+        return label_id
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Label:
     id: str
     name: str
 
-    FRAGMENT = """
-    fragment Label on Label {
-      id
-      name
-    }
-    """
+    FRAGMENT = query.fragment(
+        """
+        fragment Label on Label {
+          id
+          name
+        }
+        """
+    )
 
     @classmethod
     def from_graphql(cls, data: T.Dict[str, T.Any]) -> "Label":
@@ -46,7 +122,24 @@ class Label:
         )
 
 
-def get_repo(owner: str, name: str) -> Repo:
+def get_repo(owner: str, name: str, *, use_cache: bool = True) -> Repo:
+    """
+    Get a repository.
+
+    The id, base branch and labels of the repository are cached on disk (see
+    ``gh.cache``), so they are usually not fetched again. The head of the base
+    branch isn't cached: it is fetched when it's first used.
+    """
+    if use_cache:
+        cached = cache.get_cache().get(_cache_key(f"{owner}/{name}"))
+        if cached:
+            return Repo(
+                id=cached["id"],
+                full_name=cached["fullName"],
+                base_branch_name=cached["baseBranchName"],
+                labels=[Label(**label) for label in cached["labels"]],
+            )
+
     res = graphql(
         """
         query ($owner: String!, $name: String!) {
@@ -59,20 +152,99 @@ def get_repo(owner: str, name: str) -> Repo:
                         oid
                     }
                 }
-                labels(first: 50) {
+                labels(first: 100) {
+                    pageInfo { ...PageInfo }
                     nodes { ...Label }
                 }
             }
         }
-        """
-        + Label.FRAGMENT,
+        """,
         variables={"owner": owner, "name": name},
     )["data"]["repository"]
     assert res["id"]
-    return Repo(
+    repo = Repo(
         id=res["id"],
         full_name=res["nameWithOwner"],
-        head_sha=res["defaultBranchRef"]["target"]["oid"],
         base_branch_name=res["defaultBranchRef"]["name"],
-        labels=[Label.from_graphql(l) for l in res["labels"]["nodes"]],
+        labels=list(iter_labels(res["id"], first_page=res["labels"])),
+        _head_sha=res["defaultBranchRef"]["target"]["oid"],
+    )
+    _store(repo)
+    return repo
+
+
+def iter_labels(
+    node_id: str,
+    *,
+    first_page: T.Optional[T.Dict[str, T.Any]] = None,
+    page_size: int = 100,
+) -> T.Iterator[Label]:
+    """
+    Iterate over all the labels of a repository or of a labelable object
+    (e.g., a PR).
+
+    :param first_page: The first page of the labels, if it was already
+        fetched (e.g., along with the object). It must include
+        ``pageInfo { ...PageInfo }``.
+    """
+
+    def fetch_page(cursor: T.Optional[str]) -> dict:
+        if cursor is None and first_page is not None:
+            return first_page
+        res = graphql(
+            """
+            query GetLabels($id: ID!, $first: Int!, $after: String) {
+                node(id: $id) {
+                    ... on Repository {
+                        labels(first: $first, after: $after) {
+                            pageInfo { ...PageInfo }
+                            nodes { ...Label }
+                        }
+                    }
+                    ... on Labelable {
+                        labels(first: $first, after: $after) {
+                            pageInfo { ...PageInfo }
+                            nodes { ...Label }
+                        }
+                    }
+                }
+            }
+            """,
+            variables={"id": node_id, "first": page_size, "after": cursor},
+        )
+        return res["data"]["node"]["labels"]
+
+    for d in paginate(fetch_page):
+        yield Label.from_graphql(d)
+
+
+def get_configured_repo(*, use_cache: bool = True) -> Repo:
+    """
+    Get the repository that is configured in ``config.json``.
+    """
+    owner, name = config.get_config()["github"]["repo"].split("/")
+    return get_repo(owner, name, use_cache=use_cache)
+
+
+def invalidate_repo(owner: str, name: str) -> None:
+    """
+    Remove a repository from the cache.
+    """
+    cache.get_cache().invalidate(_cache_key(f"{owner}/{name}"))
+
+
+def _cache_key(full_name: str) -> str:
+    # What the repository looks like depends on the token that fetches it.
+    return cache.key("repo", full_name.lower(), token_fingerprint())
+
+
+def _store(repo: Repo) -> None:
+    cache.get_cache().set(
+        _cache_key(repo.full_name),
+        {
+            "id": repo.id,
+            "fullName": repo.full_name,
+            "baseBranchName": repo.base_branch_name,
+            "labels": [dataclasses.asdict(label) for label in repo.labels],
+        },
     )
@@ -0,0 +1,94 @@
+"""
+Retrying of transient GitHub errors.
+
+Requests that fail with a transient error (a 5xx response, a connection error
+or timeout, or a GraphQL "something went wrong" error) are retried with capped
+exponential backoff and full jitter.
+
+Retrying a mutation that isn't idempotent (e.g., ``createRef``) is only safe
+if we know that the original attempt didn't take effect, because GitHub may
+have applied the mutation even though we never saw the response. These
+mutations are only retried if the caller provides a ``recover`` function that
+checks whether the mutation has already been applied (see
+``gh.github.graphql``).
+"""
+import dataclasses
+import random
+import re
+import typing as T
+
+import requests
+
+NON_IDEMPOTENT_MUTATIONS = frozenset(
+    {
+        "addComment",
+        "addPullRequestReview",
+        "createCommitOnBranch",
+        "createPullRequest",
+        "createRef",
+    }
+)
+
+RETRYABLE_STATUSES = frozenset({500, 502, 503, 504})
+
+_TRANSIENT_GRAPHQL_MESSAGES = (
+    "something went wrong",
+    "timedout",
+    "timed out",
+    "timeout",
+)
+
+_MUTATION_FIELD_RE = re.compile(r"\b(" + "|".join(NON_IDEMPOTENT_MUTATIONS) + r")\s*\(")
+
+
+@dataclasses.dataclass
+class RetryPolicy:
+    max_attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+
+    @classmethod
+    def from_config(cls, config: dict) -> "RetryPolicy":
+        return cls(
+            max_attempts=config.get("maxAttempts", cls.max_attempts),
+            base_delay=config.get("baseDelay", cls.base_delay),
+            max_delay=config.get("maxDelay", cls.max_delay),
+        )
+
+    def delay(self, attempt: int) -> float:
+        """
+        Get the number of seconds to wait before retrying after the given
+        (zero-indexed) attempt failed.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def is_retryable(self, exc: Exception) -> bool:
+        # Imported here to avoid a circular import.
+        from .github import GraphQLErrorsException
+
+        if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+            return True
+        if isinstance(exc, requests.HTTPError):
+            return (
+                exc.response is not None
+                and exc.response.status_code in RETRYABLE_STATUSES
+            )
+        if isinstance(exc, GraphQLErrorsException):
+            return bool(exc.errors) and all(
+                _is_transient_graphql_error(error) for error in exc.errors
+            )
+        return False
+
+
+def _is_transient_graphql_error(error: dict) -> bool:
+    message = (error.get("message") or "").lower()
+    return any(m in message for m in _TRANSIENT_GRAPHQL_MESSAGES)
+
+
+def is_idempotent(query: str) -> bool:
+    """
+    Determine whether a GraphQL document is safe to send more than once.
+    """
+    if not query.lstrip().startswith("mutation"):
+        return True
+    return not _MUTATION_FIELD_RE.search(query)
@@ -1,20 +1,25 @@
 import dataclasses
 import typing as T
 
+from . import query
+from .utils import Lazy, lazy_attribute, lazy_repr
 
-@dataclasses.dataclass
+
+@dataclasses.dataclass(slots=True)
 class CheckRun:
     id: str
     name: str
     conclusion: str
 
-    FRAGMENT = """
+    FRAGMENT = query.fragment(
+        """
         fragment CheckRun on CheckRun {
             id
             name
             conclusion
         }
         """
+    )
 
     @classmethod
     def from_graphql(cls, data: T.Dict[str, T.Any]) -> "CheckRun":
@@ -25,12 +30,19 @@ class CheckRun:
         )
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class CheckSuite:
     conclusion: str
-    check_runs: T.List["CheckRun"]
+    _check_runs: T.Union[Lazy, T.List["CheckRun"]] = dataclasses.field(
+        default_factory=list, repr=False
+    )
 
-    FRAGMENT = (
+    # Decoded on first access.
+    check_runs = lazy_attribute("_check_runs")
+
+    __repr__ = lazy_repr
+
+    FRAGMENT = query.fragment(
         """
         fragment CheckSuite on CheckSuite {
             conclusion
@@ -41,59 +53,66 @@ class CheckSuite:
             }
         }
         """
-        + CheckRun.FRAGMENT
     )
 
     @classmethod
     def from_graphql(cls, data: T.Dict[str, T.Any]) -> "CheckSuite":
         return cls(
             conclusion=data["conclusion"],
-            check_runs=[
-                CheckRun.from_graphql(check_run)
-                for check_run in data["checkRuns"]["nodes"]
-            ],
+            _check_runs=Lazy(
+                data["checkRuns"]["nodes"], CheckRun.from_graphql, many=True
+            ),
         )
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Status:
-    contexts: T.List["StatusContext"]
+    _contexts: T.Union[Lazy, T.List["StatusContext"]] = dataclasses.field(
+        default_factory=list, repr=False
+    )
 
-    FRAGMENT = """
-    fragment Status on Status {
-        contexts {
-            context
-            state
-            description
-            createdAt
+    # Decoded on first access.
+    contexts = lazy_attribute("_contexts")
+
+    __repr__ = lazy_repr
+
+    FRAGMENT = query.fragment(
+        """
+        fragment Status on Status {
+            contexts {
+                context
+                state
+                description
+                createdAt
+            }
         }
-    }
-    """
+        """
+    )
 
     @classmethod
     def from_graphql(cls, data: T.Dict[str, T.Any]) -> "Status":
         return cls(
-            contexts=[
-                StatusContext.from_graphql(context) for context in data["contexts"]
-            ],
+            _contexts=Lazy(data["contexts"], StatusContext.from_graphql, many=True),
         )
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class StatusContext:
     context: str
     state: str
     description: str
     created_at: str
 
-    FRAGMENT = """
-    fragment StatusContext on StatusContext {
-        context
-        state
-        description
-        createdAt
-    }
-    """
+    FRAGMENT = query.fragment(
+        """
+        fragment StatusContext on StatusContext {
+            context
+            state
+            description
+            createdAt
+        }
+        """
+    )
 
     @classmethod
     def from_graphql(cls, data: T.Dict[str, T.Any]) -> "StatusContext":
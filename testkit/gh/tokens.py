@@ -0,0 +1,98 @@
+"""
+Pools of GitHub tokens.
+
+Each account (``primary`` or ``secondary``) can be configured with several
+tokens (``github.primaryTokens`` and ``github.secondaryTokens``). Since every
+token has its own rate limit budget, spreading requests over several tokens
+multiplies the throughput that can be sustained. The token used for a request
+is chosen by the pool's strategy:
+
+- ``round-robin`` -- cycle through the tokens in order (the default).
+- ``least-used`` -- the token with the fewest requests in flight (and then the
+  fewest requests overall).
+- ``most-remaining`` -- the token with the most remaining rate limit budget
+  (tokens that are paused because of a rate limit error are avoided).
+
+Note that all the tokens of the secondary account should belong to users other
+than the users of the primary tokens (GitHub doesn't allow users to approve
+their own PRs).
+"""
+import contextlib
+import threading
+import time
+import typing as T
+
+from .ratelimit import RateLimiter
+
+ROUND_ROBIN = "round-robin"
+LEAST_USED = "least-used"
+MOST_REMAINING = "most-remaining"
+STRATEGIES = (ROUND_ROBIN, LEAST_USED, MOST_REMAINING)
+
+
+class TokenPool:
+    def __init__(
+        self,
+        tokens: T.Sequence[str],
+        *,
+        strategy: str = ROUND_ROBIN,
+        get_rate_limiter: T.Callable[[str], RateLimiter],
+    ):
+        if not tokens:
+            raise ValueError("A token pool needs at least one token")
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                f"Unknown token strategy {strategy!r} (expected one of {STRATEGIES})"
+            )
+        self.tokens = list(tokens)
+        self.strategy = strategy
+        self._get_rate_limiter = get_rate_limiter
+        self._next = 0
+        self._in_flight = {token: 0 for token in self.tokens}
+        self._requests = {token: 0 for token in self.tokens}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def checkout(self, token: T.Optional[str] = None) -> T.Iterator[str]:
+        """
+        Select a token for a request (unless ``token`` is given) and keep
+        track of it while the request is in flight.
+        """
+        with self._lock:
+            token = token or self._select()
+            self._in_flight[token] = self._in_flight.get(token, 0) + 1
+            self._requests[token] = self._requests.get(token, 0) + 1
+        try:
+            yield token
+        finally:
+            with self._lock:
+                self._in_flight[token] -= 1
+
+    def usage(self) -> T.Dict[str, int]:
+        """
+        Get the number of requests that were made with each token.
+        """
+        with self._lock:
+            return dict(self._requests)
+
+    def _select(self) -> str:
+        if len(self.tokens) == 1:
+            return self.tokens[0]
+        if self.strategy == LEAST_USED:
+            return min(
+                self.tokens, key=lambda t: (self._in_flight[t], self._requests[t])
+            )
+        if self.strategy == MOST_REMAINING:
+            return max(self.tokens, key=self._remaining)
+        token = self.tokens[self._next % len(self.tokens)]
+        self._next += 1
+        return token
+
+    def _remaining(self, token: str) -> float:
+        budget = self._get_rate_limiter(token).budget
+        if budget.paused_until and budget.paused_until > time.time():
+            return float("-inf")
+        if budget.remaining is None:
+            # Prefer tokens we haven't used yet so we learn their budget.
+            return float("inf")
+        return budget.remaining - self._in_flight[token]
@@ -1,6 +1,227 @@
+import concurrent.futures
+import contextvars
+import dataclasses
+import typing as T
+
+from . import query
+
+X = T.TypeVar("X")
+Y = T.TypeVar("Y")
+
+PAGE_INFO_FRAGMENT = query.fragment(
+    """
+    fragment PageInfo on PageInfo {
+        hasNextPage
+        endCursor
+    }
+    """
+)
+
+
+class _NotFetched:
+    def __repr__(self):
+        return "NOT_FETCHED"
+
+
+# The value of a field that wasn't fetched by a query (as opposed to ``None``,
+# which means that the field was fetched and is null). It is only used while
+# an object is decoded (see ``gh.identity``).
+NOT_FETCHED = _NotFetched()
+
+
+class Lazy:
+    """
+    Raw GraphQL data of a nested object (or list of objects) that is only
+    decoded when it's first accessed (see ``lazy_attribute``).
+    """
+
+    __slots__ = ("data", "decode", "many")
+
+    def __init__(
+        self, data: T.Any, decode: T.Callable[[T.Any], T.Any], *, many: bool = False
+    ):
+        """
+        :param many: If true, ``data`` is a list and ``decode`` is applied to
+            each item.
+        """
+        self.data = data
+        self.decode = decode
+        self.many = many
+
+    @classmethod
+    def field(
+        cls,
+        data: T.Dict[str, T.Any],
+        key: str,
+        decode: T.Callable[[T.Any], T.Any],
+        *,
+        many: bool = False,
+    ) -> T.Any:
+        """
+        Get the lazy data of the field ``key`` of ``data``: ``NOT_FETCHED`` if
+        the field is missing and ``None`` if it's null.
+
+        :param many: If true, the field is a connection and its ``nodes`` are
+            decoded.
+        """
+        if key not in data:
+            return NOT_FETCHED
+        value = data[key]
+        if value is None:
+            return None
+        return cls(value["nodes"] if many else value, decode, many=many)
+
+    def __eq__(self, other):
+        # Compare the decoded values (so that objects compare the same whether
+        # or not their nested objects were decoded yet).
+        if isinstance(other, Lazy):
+            other = other.value()
+        return self.value() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"<lazy {getattr(self.decode, '__qualname__', self.decode)}>"
+
+    def value(self) -> T.Any:
+        if self.many:
+            return [self.decode(item) for item in self.data]
+        return self.decode(self.data)
+
+
+class lazy_attribute:
+    """
+    Descriptor for an attribute whose value is stored (maybe as ``Lazy``
+    data) in the slot ``slot`` and is decoded on first access.
+
+        @dataclasses.dataclass(slots=True)
+        class PullRequest:
+            _head_ref: T.Union[Lazy, Ref, None] = None
+            head_ref = lazy_attribute("_head_ref")
+    """
+
+    def __init__(self, slot: str):
+        self.slot = slot
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = getattr(obj, self.slot)
+        if isinstance(value, Lazy):
+            value = value.value()
+            setattr(obj, self.slot, value)
+        return value
+
+    def __set__(self, obj, value) -> None:
+        setattr(obj, self.slot, value)
+
+
+def lazy_repr(obj: T.Any) -> str:
+    """
+    ``__repr__`` for a dataclass with lazy attributes: shows its public fields
+    and its lazy attributes (decoded), instead of the slots that store them.
+    """
+    cls = type(obj)
+    names = [field.name for field in dataclasses.fields(obj) if field.repr]
+    names += [
+        name for name, attr in vars(cls).items() if isinstance(attr, lazy_attribute)
+    ]
+    fields = ", ".join(f"{name}={getattr(obj, name)!r}" for name in names)
+    return f"{cls.__qualname__}({fields})"
+
+
 def iter_connection(conn: dict):
     """
-    Iterate over a GraphQL Relay-style connection.
+    Iterate over (a single page of) a GraphQL Relay-style connection.
+    """
+    if "edges" in conn:
+        for i in conn["edges"]:
+            yield i["node"]
+    else:
+        yield from conn["nodes"]
+
+
+def chunked(items: T.Iterable[X], size: int) -> T.Iterator[T.List[X]]:
+    """
+    Split an iterable into lists of (at most) ``size`` items.
+    """
+    chunk: T.List[X] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def thread_map(
+    fn: T.Callable[[X], Y],
+    items: T.Iterable[X],
+    *,
+    max_workers: int = 8,
+) -> T.List[Y]:
+    """
+    Call ``fn`` for every item on a pool of threads and return the results
+    (in the same order as ``items``).
+
+    The calls are made in the caller's context (e.g., with the same account).
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    ctx = contextvars.copy_context()
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(max_workers, len(items)),
+        thread_name_prefix="gh-thread-map",
+    ) as executor:
+        return list(executor.map(lambda item: ctx.copy().run(fn, item), items))
+
+
+def paginate(
+    fetch_page: T.Callable[[T.Optional[str]], dict],
+    *,
+    prefetch: bool = False,
+) -> T.Iterator[dict]:
+    """
+    Iterate over all the nodes of a GraphQL Relay-style connection.
+
+    Pages are fetched lazily, so only one page is held in memory at a time.
+
+    :param fetch_page: Function that fetches the page after the given cursor
+        (``None`` for the first page) and returns the connection. The
+        connection must include ``pageInfo { ...PageInfo }``.
+    :param prefetch: If true, fetch the next page in the background while the
+        nodes of the current page are consumed.
     """
-    for i in conn["edges"]:
-        yield i["node"]
+    if not prefetch:
+        cursor = None
+        while True:
+            conn = fetch_page(cursor)
+            yield from iter_connection(conn)
+            if not conn["pageInfo"]["hasNextPage"]:
+                return
+            cursor = conn["pageInfo"]["endCursor"]
+
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="gh-paginate"
+    )
+
+    def submit(cursor: T.Optional[str]) -> concurrent.futures.Future:
+        # Copy the context so that the page is fetched with the same account.
+        ctx = contextvars.copy_context()
+        return executor.submit(ctx.run, fetch_page, cursor)
+
+    future = submit(None)
+    try:
+        while future:
+            conn = future.result()
+            page_info = conn["pageInfo"]
+            future = (
+                submit(page_info["endCursor"]) if page_info["hasNextPage"] else None
+            )
+            yield from iter_connection(conn)
+    finally:
+        if future:
+            future.cancel()
+        executor.shutdown(wait=False)
@@ -1,4 +1,7 @@
 import argparse
+import asyncio
+import time
+import typing as T
 
 import gh
 
@@ -19,6 +22,36 @@ parser.add_argument(
     action="store_true",
     help="Remove label(s) if they're added then re-add them.",
 )
+parser.add_argument(
+    "--rounds",
+    type=int,
+    default=1,
+    help=(
+        "The number of times to (re)label every target PR. Use with --relabel "
+        "to repeatedly toggle the labels. Defaults to 1."
+    ),
+)
+parser.add_argument(
+    "--rate",
+    type=float,
+    default=0,
+    help=(
+        "The maximum number of PRs to (re)label per second. Defaults to 0 "
+        "(unlimited)."
+    ),
+)
+parser.add_argument(
+    "--batch-size",
+    type=int,
+    default=gh.batch.DEFAULT_MAX_SIZE // 2,
+    help="The number of PRs to (re)label per request.",
+)
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=gh.aio.DEFAULT_CONCURRENCY,
+    help="The number of requests to have in flight at once.",
+)
 parser.add_argument(
     "target",
     nargs="*",
@@ -29,30 +62,96 @@ parser.add_argument(
 def main():
     args = parser.parse_args()
 
+    repo = gh.repo.get_configured_repo()
+    print(repo)
+    run(repo, args)
+
+
+def run(repo: "gh.repo.Repo", args: argparse.Namespace) -> None:
+    """
+    Add and/or remove labels of the target PRs.
+    """
     if not args.target:
         raise ValueError("No target PRs specified")
 
-    config = gh.config.get_config()
-    owner, name = config["github"]["repo"].split("/")
-    repo = gh.repo.get_repo(owner, name)
-    print(repo)
-
-    for target in args.target:
-        pr = gh.pr.get_repo_pull_request(repo.id, int(target))
+    prs = gh.pr.get_repo_pull_requests(
+        repo.id, [int(target) for target in args.target], projection=gh.query.MINIMAL
+    )
+    for pr in prs:
         print(pr)
 
-        to_remove = args.remove
-        if args.relabel:
-            to_remove.extend(args.label)
-        if to_remove:
-            gh.pr.remove_labels(
-                pr.id, [repo.resolve_label_id(label) for label in to_remove]
-            )
-
-        if args.label:
-            gh.pr.add_labels(
-                pr.id, [repo.resolve_label_id(label) for label in args.label]
-            )
+    to_remove = list(args.remove or [])
+    if args.relabel:
+        to_remove.extend(args.label or [])
+    gh.aio.set_concurrency(args.concurrency)
+    asyncio.run(
+        label_prs(
+            prs,
+            add_label_ids=[repo.resolve_label_id(label) for label in args.label or []],
+            remove_label_ids=[repo.resolve_label_id(label) for label in to_remove],
+            rounds=args.rounds,
+            rate=args.rate,
+            batch_size=args.batch_size,
+        )
+    )
+
+
+async def label_prs(
+    prs: T.List["gh.pr.PullRequest"],
+    *,
+    add_label_ids: T.List[str],
+    remove_label_ids: T.List[str],
+    rounds: int = 1,
+    rate: float = 0,
+    batch_size: int = gh.batch.DEFAULT_MAX_SIZE // 2,
+) -> None:
+    """
+    Remove and then add labels to every PR, ``rounds`` times.
+
+    The PRs are (re)labeled in concurrent batches (the labels of a PR are
+    removed and added in the same request). A round only starts once the
+    previous round is done, so the rounds of a PR are applied in order. If
+    ``rate`` is set, at most ``rate`` PRs are (re)labeled per second.
+    """
+    progress = gh.progress.Progress("Labeled PRs", len(prs) * rounds)
+    bucket = gh.ratelimit.TokenBucket(rate, batch_size)
+
+    def chunks() -> T.Iterator[T.List["gh.pr.PullRequest"]]:
+        for chunk in gh.utils.chunked(prs, batch_size):
+            # This runs on a worker thread (see gh.aio.map_unordered), so it's
+            # fine to block until the chunk may be sent.
+            time.sleep(bucket.reserve(len(chunk)))
+            yield chunk
+
+    def label(chunk: T.List["gh.pr.PullRequest"]) -> T.List[T.Optional[str]]:
+        # Mutations are executed in order, so the labels of every PR are
+        # removed before they are added back.
+        results: T.List[T.List["gh.batch.BatchResult[None]"]] = []
+        with gh.batch.Batch(max_size=2 * len(chunk)) as b:
+            for pr in chunk:
+                res = []
+                if remove_label_ids:
+                    res.append(b.remove_labels(pr.id, remove_label_ids))
+                if add_label_ids:
+                    res.append(b.add_labels(pr.id, add_label_ids))
+                results.append(res)
+        return [
+            next((str(r.error()) for r in res if not r.ok()), None) for res in results
+        ]
+
+    for _ in range(rounds):
+        async for chunk, errors, error in gh.aio.map_unordered(label, chunks()):
+            if error:
+                print(f"Failed to label {len(chunk)} PRs: {error}")
+                progress.update(0, failed=len(chunk))
+                continue
+            for pr, pr_error in zip(chunk, errors):
+                if pr_error:
+                    print(f"Failed to label PR #{pr.number}: {pr_error}")
+                    progress.update(0, failed=1)
+                else:
+                    progress.update()
+    progress.finish()
 
 
 if __name__ == "__main__":
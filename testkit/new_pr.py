@@ -1,6 +1,8 @@
 import argparse
+import asyncio
 import random
 import time
+import typing as T
 
 import gh
 
@@ -38,37 +40,125 @@ parser.add_argument(
     default=1,
     help=("The number of commits to add to each PR branch. "),
 )
+parser.add_argument(
+    "--bulk-commits",
+    action="store_true",
+    help=(
+        "Create the commits of a PR with the Git Data API instead of one "
+        "createCommitOnBranch mutation per commit (the commits are not signed, "
+        "and every commit takes 3 requests)."
+    ),
+)
 parser.add_argument(
     "--title",
     help="The title of the pull request.",
 )
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=1,
+    help=(
+        "The number of PRs to create in parallel. Approving and labeling PRs "
+        "overlaps with creating the next PRs. Defaults to 1."
+    ),
+)
 
 
 def main():
     args = parser.parse_args()
 
-    conf = gh.config.get_config()
-    repo_owner, repo_name = conf["github"]["repo"].split("/")
-    repo = gh.repo.get_repo(repo_owner, repo_name)
+    repo = gh.repo.get_configured_repo()
     print(repo)
+    run(repo, args)
+
 
+def run(repo: "gh.repo.Repo", args: argparse.Namespace) -> None:
+    """
+    Create ``args.count`` PRs (see the options of the parser).
+    """
     mqid = random.randint(1, 100000)
-    for n in range(args.count):
-        print("\n\nCreating PR #{}/{}".format(n + 1, args.count))
-        create_new_pr(repo, f"mq-qa-{mqid}-{n+1}", args)
+    stats = gh.progress.StageStats()
+    if args.concurrency > 1:
+        gh.aio.set_concurrency(args.concurrency)
+        prs = asyncio.run(create_new_prs(repo, mqid, args, stats=stats))
+    else:
+        prs = []
+        for n in range(args.count):
+            print("\n\nCreating PR #{}/{}".format(n + 1, args.count))
+            prs.append(create_new_pr(repo, f"mq-qa-{mqid}-{n+1}", args, stats=stats))
+
+    elapsed = time.monotonic() - stats.started_at
+    print(
+        f"\n\nCreated {len(prs)}/{args.count} PRs in {elapsed:.1f}s "
+        f"({len(prs) / elapsed:.2f} PRs/s)"
+    )
+    print(stats.report())
 
 
-def create_new_pr(repo: "gh.repo.Repo", branch_name: str, args):
+async def create_new_prs(
+    repo: "gh.repo.Repo",
+    mqid: int,
+    args,
+    *,
+    stats: T.Optional["gh.progress.StageStats"] = None,
+) -> T.List["gh.pr.PullRequest"]:
+    """
+    Create PRs concurrently.
+
+    Approving and labeling a PR (which is done by the secondary account) is
+    scheduled as soon as the PR is opened, so it overlaps with the creation of
+    the next PRs.
+    """
+    branch_names = [f"mq-qa-{mqid}-{n+1}" for n in range(args.count)]
+    prs = []
+    finishing = []
+    async for branch_name, pr, error in gh.aio.map_unordered(
+        lambda branch_name: open_pr(repo, branch_name, args, stats=stats),
+        branch_names,
+    ):
+        if error:
+            print(f"Failed to create PR for {branch_name}: {error!r}")
+            continue
+        prs.append(pr)
+        finishing.append(
+            asyncio.ensure_future(gh.aio.call(finish_pr, repo, pr, args, stats=stats))
+        )
+
+    results = await asyncio.gather(*finishing, return_exceptions=True)
+    for pr, result in zip(prs, results):
+        if isinstance(result, BaseException):
+            print(f"Failed to approve/label PR #{pr.number}: {result!r}")
+    return sorted(prs, key=lambda pr: pr.number)
+
+
+def create_new_pr(
+    repo: "gh.repo.Repo",
+    branch_name: str,
+    args,
+    *,
+    stats: T.Optional["gh.progress.StageStats"] = None,
+):
+    pr = open_pr(repo, branch_name, args, stats=stats)
+    finish_pr(repo, pr, args, stats=stats)
+    return pr
+
+
+def open_pr(
+    repo: "gh.repo.Repo",
+    branch_name: str,
+    args,
+    *,
+    stats: T.Optional["gh.progress.StageStats"] = None,
+) -> "gh.pr.PullRequest":
+    """
+    Create the branch, commit(s) and PR.
+    """
+    stats = stats or gh.progress.StageStats()
     pr_title = f"{branch_name}"
     if args.title:
         pr_title += f": {args.title}"
 
-    # create a branch
-    branch = gh.ref.mutation_create_branch_ref(repo.id, branch_name, repo.head_sha)
-    print(branch)
-
-    # create a commit
-    head_sha = repo.head_sha
+    commits = []
     for n in range(args.n_commits):
         commit_headline = pr_title if args.n_commits == 1 else f"{pr_title} [{n+1}]"
         file_name = (
@@ -76,38 +166,82 @@ def create_new_pr(repo: "gh.repo.Repo", branch_name: str, args):
             if args.n_commits > 1
             else f"mq-qa/{branch_name}.txt"
         )
-        branch_commit = gh.commit.mutation_create_commit_on_branch(
-            branch.id,
-            head_sha,
-            commit_headline,
-            additions=[
-                gh.commit.Addition(file_name, str(time.time())),
-            ],
+        commits.append(
+            gh.commit.CommitSpec(
+                commit_headline, [gh.commit.Addition(file_name, str(time.time()))]
+            )
         )
-        print(branch_commit)
-        head_sha = branch_commit.sha
+
+    base_sha = repo.head_sha
+    if args.bulk_commits:
+        # create all the commits, then a branch that points to the last one
+        with stats.time("commits"):
+            shas = gh.commit.build_commit_chain(repo.full_name, base_sha, commits)
+        print(f"Created {len(shas)} commits")
+        with stats.time("branch"):
+            branch = gh.ref.mutation_create_branch_ref(
+                repo.id, branch_name, shas[-1], projection=gh.query.MINIMAL
+            )
+        print(branch)
+    else:
+        # create a branch
+        with stats.time("branch"):
+            branch = gh.ref.mutation_create_branch_ref(
+                repo.id, branch_name, base_sha, projection=gh.query.MINIMAL
+            )
+        print(branch)
+
+        # create a commit
+        head_sha = base_sha
+        for spec in commits:
+            with stats.time("commit"):
+                branch_commit = gh.commit.mutation_create_commit_on_branch(
+                    branch.id,
+                    head_sha,
+                    spec.headline,
+                    additions=spec.additions,
+                    projection=gh.query.MINIMAL,
+                )
+            print(branch_commit)
+            head_sha = branch_commit.sha
 
     # open a pr
     base_branch = args.base_branch or repo.base_branch_name
-    pr = gh.pr.create_pull_request(
-        repo.id,
-        pr_title,
-        base_branch,
-        branch_name,
-    )
+    with stats.time("pr"):
+        pr = gh.pr.create_pull_request(
+            repo.id,
+            pr_title,
+            base_branch,
+            branch_name,
+            projection=gh.query.MINIMAL,
+        )
     print(pr)
+    return pr
+
+
+def finish_pr(
+    repo: "gh.repo.Repo",
+    pr: "gh.pr.PullRequest",
+    args,
+    *,
+    stats: T.Optional["gh.progress.StageStats"] = None,
+) -> None:
+    """
+    Approve and label the PR (as requested by ``args``).
+    """
+    stats = stats or gh.progress.StageStats()
 
     # approve the pr
     if args.approve:
-        with gh.github.github_account("secondary"):
+        with stats.time("approve"), gh.github.github_account("secondary"):
             approval = gh.pr.add_pull_request_review(pr.id, "APPROVE")
-            print(approval)
+        print(approval)
 
     # add labels
     if args.label:
         label_ids = [repo.resolve_label_id(label) for label in args.label]
-        gh.pr.add_labels(pr.id, label_ids)
-    return pr
+        with stats.time("label"):
+            gh.pr.add_labels(pr.id, label_ids)
 
 
 if __name__ == "__main__":
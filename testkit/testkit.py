@@ -0,0 +1,140 @@
+"""
+Run the testkit scripts as subcommands of a single, long-lived process.
+
+    python ./testkit.py new-pr -c 3 -a
+    python ./testkit.py --batch commands.txt
+    python ./testkit.py
+
+With a command, it is run once (like the corresponding script). With
+``--batch``, every line of the file is run as a command. Without either, the
+commands are read from stdin (interactively if it is a terminal).
+
+All the commands of a process share the config, the HTTP sessions, the rate
+limiters and the repository, so these are only set up (and the repository is
+only queried) once. Scripts are only imported when they are first used.
+"""
+import argparse
+import importlib
+import shlex
+import sys
+import time
+import typing as T
+
+import gh
+
+# The script module that implements every command.
+COMMANDS = {
+    "new-pr": "new_pr",
+    "stacked": "create_stacked_prs",
+    "conflict": "create_merge_conflict",
+    "approve-all": "approve_all_prs",
+    "close-all": "close_all_prs",
+    "label": "label_pr",
+    "delete-branches": "delete_branches",
+    "workload": "workload",
+}
+
+parser = argparse.ArgumentParser(
+    description="Run testkit commands in a single process.",
+    epilog=f"Commands: {', '.join(COMMANDS)}. Run `<command> --help` for help.",
+)
+parser.add_argument(
+    "--batch",
+    help="Run the commands in this file (one per line).",
+)
+parser.add_argument(
+    "--keep-going",
+    action="store_true",
+    help="Keep running the commands of a batch after a command fails.",
+)
+parser.add_argument(
+    "command",
+    nargs=argparse.REMAINDER,
+    help="The command to run (and its arguments).",
+)
+
+_repo: T.Optional["gh.repo.Repo"] = None
+
+
+def main():
+    args = parser.parse_args()
+
+    if args.command:
+        sys.exit(0 if run_command(args.command) else 1)
+    if args.batch:
+        with open(args.batch) as f:
+            ok = run_lines(f, keep_going=args.keep_going)
+        sys.exit(0 if ok else 1)
+    run_lines(_prompt() if sys.stdin.isatty() else sys.stdin, keep_going=True)
+
+
+def get_repo() -> "gh.repo.Repo":
+    """
+    Get the configured repository, querying it only the first time.
+    """
+    global _repo
+    if _repo is None:
+        _repo = gh.repo.get_configured_repo()
+        print(_repo)
+    else:
+        # The base branch may have moved since the previous command.
+        _repo.expire_head_sha()
+    return _repo
+
+
+def run_lines(lines: T.Iterable[str], *, keep_going: bool = False) -> bool:
+    """
+    Run every line as a command (skipping blank lines and comments). Returns
+    whether all the commands succeeded.
+    """
+    ok = True
+    for line in lines:
+        argv = shlex.split(line, comments=True)
+        if not argv:
+            continue
+        if argv[0] in ("exit", "quit"):
+            break
+        if not run_command(argv):
+            ok = False
+            if not keep_going:
+                break
+    return ok
+
+
+def run_command(argv: T.List[str]) -> bool:
+    """
+    Run a single command. Returns whether it succeeded.
+    """
+    name, *rest = argv
+    if name not in COMMANDS:
+        print(f"Unknown command {name!r} (expected one of {', '.join(COMMANDS)})")
+        return False
+    script = importlib.import_module(COMMANDS[name])
+    script.parser.prog = f"{parser.prog} {name}"
+    started_at = time.monotonic()
+    try:
+        # Parse the arguments first so that --help and invalid arguments
+        # don't need the repository.
+        args = script.parser.parse_args(rest)
+        script.run(get_repo(), args)
+    except SystemExit as e:
+        # Raised by argparse (e.g., for --help or invalid arguments).
+        return not e.code
+    except Exception as e:
+        print(f"Command {name!r} failed: {e!r}")
+        return False
+    print(f"Command {name!r} took {time.monotonic() - started_at:.1f}s")
+    return True
+
+
+def _prompt() -> T.Iterator[str]:
+    while True:
+        try:
+            yield input("testkit> ")
+        except EOFError:
+            print()
+            return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The scripts import ``gh`` from the testkit directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
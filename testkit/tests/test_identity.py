@@ -0,0 +1,98 @@
+import gh
+from gh.pr import PullRequest
+
+
+def pr_data(**fields):
+    return {
+        "id": "PR_1",
+        "number": 1,
+        "state": "OPEN",
+        "permalink": "https://github.com/o/r/pull/1",
+        **fields,
+    }
+
+
+def ref_data(sha: str = "abc"):
+    return {"id": "REF_1", "name": "b1", "target": {"id": f"C_{sha}", "sha": sha}}
+
+
+def full_pr_data():
+    return pr_data(
+        headRef=ref_data(),
+        labels={
+            "pageInfo": {"hasNextPage": False, "endCursor": None},
+            "nodes": [{"id": "L_1", "name": "mq"}],
+        },
+        reviewDecision="APPROVED",
+        viewerLatestReview={"id": "R_1", "state": "APPROVED"},
+    )
+
+
+def test_new_objects_outside_of_a_session():
+    a = PullRequest.from_graphql(full_pr_data())
+    b = PullRequest.from_graphql(full_pr_data())
+    assert a is not b
+    assert a == b
+
+
+def test_missing_fields_are_none_outside_of_a_session():
+    pr = PullRequest.from_graphql(pr_data())
+    assert pr.head_ref is None
+    assert pr.labels is None
+    assert pr.review_decision is None
+    assert not pr.is_approved_by_viewer()
+
+
+def test_shared_instances():
+    with gh.identity.session() as identity_map:
+        a = PullRequest.from_graphql(full_pr_data())
+        b = PullRequest.from_graphql(pr_data(state="MERGED"))
+        other = PullRequest.from_graphql(
+            pr_data(id="PR_2", number=2, headRef={**ref_data(), "id": "REF_2"})
+        )
+    assert a is b
+    assert a.state == "MERGED"
+    # Nested objects decoded after the session still resolve to one instance.
+    assert a.head_ref.target is other.head_ref.target
+    assert len(identity_map) == 5
+
+
+def test_refresh_keeps_fields_that_were_not_fetched():
+    with gh.identity.session():
+        pr = PullRequest.from_graphql(full_pr_data())
+        PullRequest.from_graphql(pr_data(state="CLOSED"))
+    assert pr.state == "CLOSED"
+    assert pr.head_ref.name == "b1"
+    assert pr.has_label("mq")
+    assert pr.review_decision == "APPROVED"
+    assert pr.is_approved_by_viewer()
+
+
+def test_refresh_clears_fields_that_were_fetched_as_null():
+    with gh.identity.session():
+        pr = PullRequest.from_graphql(full_pr_data())
+        assert pr.is_approved_by_viewer()
+        PullRequest.from_graphql(
+            pr_data(headRef=None, reviewDecision=None, viewerLatestReview=None)
+        )
+    assert pr.head_ref is None
+    assert pr.review_decision is None
+    assert pr.viewer_latest_review is None
+    assert not pr.is_approved_by_viewer()
+    assert pr.has_label("mq")
+
+
+def test_refresh_resets_label_names():
+    with gh.identity.session():
+        pr = PullRequest.from_graphql(full_pr_data())
+        assert pr.has_label("mq")
+        PullRequest.from_graphql(
+            pr_data(
+                labels={
+                    "pageInfo": {"hasNextPage": False, "endCursor": None},
+                    "nodes": [{"id": "L_2", "name": "other"}],
+                }
+            )
+        )
+    assert not pr.has_label("mq")
+    assert pr.has_label("other")
@@ -0,0 +1,338 @@
+import argparse
+import asyncio
+import dataclasses
+import json
+import random
+import time
+import typing as T
+
+import create_merge_conflict
+import create_stacked_prs
+import gh
+import new_pr
+
+R = T.TypeVar("R")
+
+# Exponentially distributed gaps between arrivals (a Poisson process).
+DISTRIBUTION_POISSON = "poisson"
+# The same gap between all arrivals.
+DISTRIBUTION_CONSTANT = "constant"
+DISTRIBUTIONS = (DISTRIBUTION_POISSON, DISTRIBUTION_CONSTANT)
+
+KIND_SINGLE = "single"
+KIND_STACKED = "stacked"
+KIND_CONFLICT = "conflict"
+
+# The parser of the script whose options every kind of arrival accepts.
+_PARSERS = {
+    KIND_SINGLE: new_pr.parser,
+    KIND_STACKED: create_stacked_prs.parser,
+    KIND_CONFLICT: create_merge_conflict.parser,
+}
+
+parser = argparse.ArgumentParser(
+    description=(
+        "Create PRs at a target rate (open loop) as described by a scenario "
+        "file. See scenario.sample.json."
+    ),
+)
+parser.add_argument(
+    "scenario",
+    help="The path to the scenario file.",
+)
+parser.add_argument(
+    "--duration",
+    type=float,
+    help="Override the duration of the scenario (in seconds).",
+)
+parser.add_argument(
+    "--seed",
+    type=int,
+    help="Override the seed of the scenario.",
+)
+
+
+@dataclasses.dataclass
+class Workload:
+    """
+    A kind of arrival (e.g., a stack of 3 PRs) and how often it arrives
+    relative to the other kinds.
+    """
+
+    kind: str
+    weight: float
+    # The options of the script that creates this kind of PRs.
+    args: argparse.Namespace
+    approve: bool = False
+    approve_delay: float = 0
+    labels: T.List[str] = dataclasses.field(default_factory=list)
+    label_delay: float = 0
+
+    @classmethod
+    def from_config(cls, config: T.Dict[str, T.Any]) -> "Workload":
+        kind = config["type"]
+        if kind not in _PARSERS:
+            raise ValueError(
+                f"Unknown workload type {kind!r} (expected one of {tuple(_PARSERS)})"
+            )
+        return cls(
+            kind=kind,
+            weight=float(config.get("weight", 1)),
+            args=_PARSERS[kind].parse_args(config.get("args", [])),
+            approve=bool(config.get("approve", False)),
+            approve_delay=float(config.get("approveDelay", 0)),
+            labels=list(config.get("labels", [])),
+            label_delay=float(config.get("labelDelay", 0)),
+        )
+
+
+@dataclasses.dataclass
+class Scenario:
+    duration: float
+    arrivals_per_minute: float
+    mix: T.List[Workload]
+    distribution: str = DISTRIBUTION_POISSON
+    seed: T.Optional[int] = None
+    concurrency: int = gh.aio.DEFAULT_CONCURRENCY
+    max_in_flight: int = 100
+
+    @classmethod
+    def from_config(cls, config: T.Dict[str, T.Any]) -> "Scenario":
+        distribution = config.get("distribution", DISTRIBUTION_POISSON)
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown arrival distribution {distribution!r} "
+                f"(expected one of {DISTRIBUTIONS})"
+            )
+        return cls(
+            duration=float(config["duration"]),
+            arrivals_per_minute=float(config["arrivalsPerMinute"]),
+            mix=[Workload.from_config(w) for w in config["mix"]],
+            distribution=distribution,
+            seed=config.get("seed"),
+            concurrency=int(config.get("concurrency", gh.aio.DEFAULT_CONCURRENCY)),
+            max_in_flight=int(config.get("maxInFlight", 100)),
+        )
+
+    def arrival_times(self, rng: random.Random) -> T.Iterator[float]:
+        """
+        Generate the times (in seconds since the start) of the arrivals.
+        """
+        rate = self.arrivals_per_minute / 60
+        t = 0.0
+        while True:
+            if self.distribution == DISTRIBUTION_POISSON:
+                t += rng.expovariate(rate)
+            else:
+                t += 1 / rate
+            if t >= self.duration:
+                return
+            yield t
+
+    def pick(self, rng: random.Random) -> Workload:
+        return rng.choices(self.mix, weights=[w.weight for w in self.mix])[0]
+
+
+def main():
+    args = parser.parse_args()
+
+    repo = gh.repo.get_configured_repo()
+    print(repo)
+    run(repo, args)
+
+
+def run(repo: "gh.repo.Repo", args: argparse.Namespace) -> None:
+    """
+    Run the scenario file ``args.scenario``.
+    """
+    with open(args.scenario) as f:
+        scenario = Scenario.from_config(json.load(f))
+    if args.duration is not None:
+        scenario.duration = args.duration
+    if args.seed is not None:
+        scenario.seed = args.seed
+
+    gh.aio.set_concurrency(scenario.concurrency)
+    asyncio.run(run_scenario(repo, scenario))
+
+
+async def run_scenario(repo: "gh.repo.Repo", scenario: Scenario) -> None:
+    """
+    Run the scenario: start an arrival at every arrival time, without waiting
+    for the previous arrivals to finish (i.e., open loop), and then wait for
+    the arrivals that are still in flight.
+
+    If ``scenario.max_in_flight`` arrivals are already in flight, an arrival
+    is dropped (rather than delayed, which would lower the offered load).
+    Arrivals may still be delayed by the concurrency limit of ``gh.aio``, so
+    the achieved rate is based on when arrivals actually start making
+    requests (and the delay is reported as the ``queue`` stage).
+    """
+    rng = random.Random(scenario.seed)
+    run_id = rng.randint(1, 100000)
+    loop = asyncio.get_running_loop()
+    stats = gh.progress.StageStats()
+    progress = gh.progress.Progress("Completed arrivals", interval=10)
+    in_flight: T.Set["asyncio.Future[None]"] = set()
+    dispatched, dropped = 0, 0
+    created: T.List[int] = []
+    # When every arrival started making requests (see time.monotonic).
+    starts: T.List[float] = []
+
+    started_at = loop.time()
+    started_at_monotonic = time.monotonic()
+    for n, offset in enumerate(scenario.arrival_times(rng)):
+        delay = started_at + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # How late the arrival is dispatched (e.g., because the loop was busy).
+        stats.record("lag", max(0.0, loop.time() - started_at - offset))
+        if len(in_flight) >= scenario.max_in_flight:
+            dropped += 1
+            continue
+        workload = scenario.pick(rng)
+        # Branch every arrival off the current head of the base branch.
+        repo.expire_head_sha()
+        future = asyncio.ensure_future(
+            _arrive(repo, workload, f"{run_id}-{n}", progress, stats, created, starts)
+        )
+        in_flight.add(future)
+        future.add_done_callback(in_flight.discard)
+        dispatched += 1
+
+    print(f"\n\nWaiting for {len(in_flight)} arrivals in flight")
+    await asyncio.gather(*in_flight)
+    progress.finish()
+
+    # The last arrival usually starts before the end of the scenario, unless
+    # arrivals were queued.
+    last_start = max(starts, default=started_at_monotonic)
+    elapsed = max(scenario.duration, last_start - started_at_monotonic)
+    print(
+        f"Target rate:   {scenario.arrivals_per_minute:.1f} arrivals/min "
+        f"({scenario.distribution})\n"
+        f"Achieved rate: {len(starts) / elapsed * 60:.1f} arrivals/min "
+        f"({len(starts)} started in {elapsed:.0f}s, {dispatched} dispatched, "
+        f"{dropped} dropped)\n"
+        f"Created PRs:   {len(created)} ({len(created) / elapsed * 60:.1f}/min)"
+    )
+    print(stats.report())
+
+
+async def _arrive(
+    repo: "gh.repo.Repo",
+    workload: Workload,
+    name: str,
+    progress: "gh.progress.Progress",
+    stats: "gh.progress.StageStats",
+    created: T.List[int],
+    starts: T.List[float],
+) -> None:
+    dispatched_at = time.monotonic()
+    # When the calls of the arrival started running on a worker thread.
+    call_starts: T.List[float] = []
+    try:
+        with stats.time(workload.kind):
+            prs = await _create(repo, workload, name, call_starts)
+        created.extend(pr.number for pr in prs)
+        await asyncio.gather(*(_finish(repo, workload, pr, stats) for pr in prs))
+    except Exception as e:
+        print(f"Failed {workload.kind} arrival {name}: {e!r}")
+        progress.update(0, failed=1)
+    else:
+        progress.update()
+    finally:
+        if call_starts:
+            starts.append(min(call_starts))
+            # How long the arrival waited for a free slot (see gh.aio).
+            stats.record("queue", min(call_starts) - dispatched_at)
+
+
+async def _create(
+    repo: "gh.repo.Repo", workload: Workload, name: str, starts: T.List[float]
+) -> T.List["gh.pr.PullRequest"]:
+    args = workload.args
+    if workload.kind == KIND_SINGLE:
+        pr = await gh.aio.call(
+            _recording_start(new_pr.open_pr, starts),
+            repo,
+            f"mq-qa-load-{name}",
+            args,
+        )
+        return [pr]
+    if workload.kind == KIND_STACKED:
+        # The PRs of a stack depend on each other, so they are created in order.
+        return await gh.aio.call(
+            _recording_start(create_stacked_prs.create_stack, starts),
+            repo,
+            f"mq-qa-load-{name}",
+            args,
+        )
+    if workload.kind == KIND_CONFLICT:
+        return await asyncio.gather(
+            *(
+                gh.aio.call(
+                    _recording_start(create_merge_conflict.create_pr, starts),
+                    repo,
+                    f"load-{name}",
+                    n,
+                    create_merge_conflict.conflict_files(
+                        args.topology, f"load-{name}", n, args.size
+                    ),
+                    approve=args.approve,
+                    labels=args.label,
+                )
+                for n in range(args.size)
+            )
+        )
+    raise ValueError(f"Unknown workload type: {workload.kind!r}")
+
+
+def _recording_start(
+    fn: T.Callable[..., R], starts: T.List[float]
+) -> T.Callable[..., R]:
+    """
+    Wrap ``fn`` to append the time at which it starts running to ``starts``.
+    """
+
+    def wrapper(*args, **kwargs) -> R:
+        starts.append(time.monotonic())
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+async def _finish(
+    repo: "gh.repo.Repo",
+    workload: Workload,
+    pr: "gh.pr.PullRequest",
+    stats: "gh.progress.StageStats",
+) -> None:
+    """
+    Approve and label the PR after the delays of the workload.
+    """
+
+    async def approve() -> None:
+        await asyncio.sleep(workload.approve_delay)
+        with stats.time("approve"), gh.github.github_account("secondary"):
+            await gh.aio.add_pull_request_review(pr.id)
+
+    async def label() -> None:
+        await asyncio.sleep(workload.label_delay)
+        # Resolving the labels may refetch them, so it's done on a worker thread.
+        label_ids = await gh.aio.call(
+            lambda: [repo.resolve_label_id(label) for label in workload.labels]
+        )
+        with stats.time("label"):
+            await gh.aio.add_labels(pr.id, label_ids)
+
+    steps = []
+    if workload.approve:
+        steps.append(approve())
+    if workload.labels:
+        steps.append(label())
+    await asyncio.gather(*steps)
+
+
+if __name__ == "__main__":
+    main()